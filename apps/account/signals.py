@@ -0,0 +1,27 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .wishlist import WishlistItem, invalidate_wishlists
+
+
+@receiver(m2m_changed, sender=WishlistItem)
+def wishlist_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drop the cached wishlists touched by Product.users_wishlist or
+    Customer.user_wishlist changes.
+    """
+    if reverse:
+        # instance is the customer
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_wishlists([instance.pk])
+    elif action == "pre_clear":
+        # instance is the product; remember who loses it before the rows go
+        instance._wishlist_users = list(
+            WishlistItem.objects.filter(product_id=instance.pk).values_list(
+                "customer_id", flat=True
+            )
+        )
+    elif action == "post_clear":
+        invalidate_wishlists(getattr(instance, "_wishlist_users", []))
+    elif action in ("post_add", "post_remove"):
+        invalidate_wishlists(pk_set)
@@ -0,0 +1,26 @@
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from jobs.queue import job
+
+from .models import Customer
+from .tokens import account_activation_token
+
+
+@job()
+def send_account_email(user_id, domain, subject, template):
+    """
+    Email a customer a link carrying their activation token.
+    """
+    user = Customer.objects.get(pk=user_id)
+    message = render_to_string(
+        template,
+        {
+            "user": user,
+            "domain": domain,
+            "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+            "token": account_activation_token.make_token(user),
+        },
+    )
+    user.email_user(subject=subject, message=message)
@@ -1,3 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from account.wishlist import (
+    get_wishlist_ids,
+    in_wishlist,
+    toggle_wishlist,
+    wishlist_key,
+)
+from core.routers import PrimaryReplicaRouter
+from store.models import Category, Product, ProductType
+
+
+class TestWishlist(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.products = [
+            Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            for i in range(3)
+        ]
+
+    def test_ids_are_cached(self):
+        """
+        Test the wishlist is read from the database once
+        """
+        self.products[0].users_wishlist.add(self.user)
+        with self.assertNumQueries(1):
+            self.assertTrue(in_wishlist(self.user, self.products[0].id))
+            self.assertFalse(in_wishlist(self.user, self.products[1].id))
+
+    def test_ids_read_from_primary(self):
+        """
+        Test the cached set is never filled from a replica
+        """
+        with mock.patch.object(
+            PrimaryReplicaRouter, "db_for_read", return_value="replica"
+        ):
+            self.assertEqual(get_wishlist_ids(self.user), frozenset())
+
+    def test_m2m_changes_invalidate(self):
+        """
+        Test changes through either side of the relation refresh the cache
+        """
+        self.assertEqual(get_wishlist_ids(self.user), frozenset())
+        self.products[0].users_wishlist.add(self.user)
+        self.assertEqual(get_wishlist_ids(self.user), {self.products[0].id})
+        self.user.user_wishlist.add(self.products[1])
+        self.assertEqual(
+            get_wishlist_ids(self.user), {self.products[0].id, self.products[1].id}
+        )
+        self.user.user_wishlist.remove(self.products[1])
+        self.assertEqual(get_wishlist_ids(self.user), {self.products[0].id})
+        self.products[0].users_wishlist.clear()
+        self.assertEqual(get_wishlist_ids(self.user), frozenset())
+
+    def test_invalidated_again_on_commit(self):
+        """
+        Test a change drops the cached wishlist once more after its
+        transaction commits, discarding a copy read before the commit
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].users_wishlist.add(self.user)
+            get_wishlist_ids(self.user)
+        self.assertIsNone(cache.get(wishlist_key(self.user.pk)))
+
+    def test_toggle(self):
+        """
+        Test a toggle is a single statement once the wishlist is cached
+        """
+        product = self.products[2]
+        get_wishlist_ids(self.user)
+        with self.assertNumQueries(1):
+            self.assertTrue(toggle_wishlist(self.user, product.id))
+        self.assertTrue(product.users_wishlist.filter(id=self.user.id).exists())
+        get_wishlist_ids(self.user)
+        with self.assertNumQueries(1):
+            self.assertFalse(toggle_wishlist(self.user, product.id))
+        self.assertFalse(product.users_wishlist.exists())
+
+    def test_product_detail(self):
+        """
+        Test the product page shows the wishlist state without loading it
+        """
+        self.client.force_login(self.user)
+        product = self.products[0]
+        url = reverse("store:product_detail", args=[product.slug])
+        self.assertContains(self.client.get(url), "Add to Wish List")
 
-# Create your tests here.
+        self.client.get(
+            reverse("account:user_wishlist", args=[product.id]), HTTP_REFERER=url
+        )
+        self.assertContains(self.client.get(url), "Remove from Wish List")
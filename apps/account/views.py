@@ -5,11 +5,10 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.db.models.query_utils import Q
 from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import redirect, render, get_object_or_404
-from django.template.loader import render_to_string
 from django.template.response import TemplateResponse
 from django.urls import reverse, reverse_lazy
-from django.utils.encoding import force_bytes, force_str
-from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 from django.views.generic import (
     FormView,
     TemplateView,
@@ -19,11 +18,14 @@ from django.views.generic import (
     CreateView,
 )
 from django.views.generic.edit import DeleteView, DeletionMixin, BaseDeleteView
+from jobs.queue import enqueue
 from store.models import Product
 
 from .forms import RegistrationForm, UserEditForm, UserReactivateForm, UserAddressForm
 from .models import Customer, Address
+from .tasks import send_account_email
 from .tokens import account_activation_token
+from .wishlist import toggle_wishlist
 from orders.models import Order
 
 class Wishlist(LoginRequiredMixin, TemplateView):
@@ -42,12 +44,10 @@ class Wishlist(LoginRequiredMixin, TemplateView):
 class WishlistAdd(LoginRequiredMixin, View):
     def get(self, request, *args,**kwargs):
         product = self.get_object()
-        if product.users_wishlist.filter(id=request.user.id).exists():
-            product.users_wishlist.remove(request.user)
-            messages.success(request, product.title + " has been removed from your WishList")
-        else:
-            product.users_wishlist.add(request.user)
+        if toggle_wishlist(request.user, product.id):
             messages.success(request, "Added " + product.title + " to your WishList")
+        else:
+            messages.success(request, product.title + " has been removed from your WishList")
         return HttpResponseRedirect(request.META["HTTP_REFERER"])
         
     def get_object(self):
@@ -99,21 +99,13 @@ class AccountRegister(FormView):
         user.set_password(form.cleaned_data["password"])
         user.is_active = False
         user.save()
-        # self.email_service.send_message(
-        #     subject, user, ...
-        # )
-        current_site = get_current_site(self.request)
-        subject = "Activate your Account"
-        message = render_to_string(
-            "account/registration/account_activation_email.html",
-            {
-                "user": user,
-                "domain": current_site.domain,
-                "uid": urlsafe_base64_encode(force_bytes(user.pk)),
-                "token": account_activation_token.make_token(user),
-            },
+        enqueue(
+            send_account_email,
+            user_id=user.pk,
+            domain=get_current_site(self.request).domain,
+            subject="Activate your Account",
+            template="account/registration/account_activation_email.html",
         )
-        user.email_user(subject=subject, message=message)
         return render(self.request, "account/registration/register_email_confirm.html")
 
 
@@ -144,18 +136,13 @@ class AccountReactivate(FormView):
         user = Customer.objects.filter(email=email)
         if user.exists():
             user = user.first()
-            current_site = get_current_site(self.request)
-            subject = "Reactivate your Account"
-            message = render_to_string(
-                "account/registration/account_reactivation_email.html",
-                {
-                    "user": user,
-                    "domain": current_site.domain,
-                    "uid": urlsafe_base64_encode(force_bytes(user.pk)),
-                    "token": account_activation_token.make_token(user),
-                },
+            enqueue(
+                send_account_email,
+                user_id=user.pk,
+                domain=get_current_site(self.request).domain,
+                subject="Reactivate your Account",
+                template="account/registration/account_reactivation_email.html",
             )
-            user.email_user(subject=subject, message=message)
             messages.success(
                 self.request, "Your request has been sended. Please check your email."
             )
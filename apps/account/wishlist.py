@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from core.helpers import invalidate_on_commit
+from store.models import Product
+
+# The table behind Product.users_wishlist, with product_id and customer_id
+WishlistItem = Product.users_wishlist.through
+
+
+def wishlist_key(user_id):
+    return "account:wishlist:%s" % user_id
+
+
+def get_wishlist_ids(user):
+    """
+    Return the ids of the products on a customer's wishlist. The set is
+    read from the database once and then served from the cache until the
+    wishlist changes.
+
+    It is read from the primary: toggle_wishlist() decides between adding
+    and removing from it, so a set filled from a lagging replica would
+    stay wrong for the whole cache lifetime.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    key = wishlist_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            WishlistItem.objects.using(DEFAULT_DB_ALIAS)
+            .filter(customer_id=user.pk)
+            .values_list("product_id", flat=True)
+        )
+        cache.set(key, ids, getattr(settings, "WISHLIST_CACHE_SECONDS", 86400))
+    return ids
+
+
+def in_wishlist(user, product_id):
+    return product_id in get_wishlist_ids(user)
+
+
+def toggle_wishlist(user, product_id):
+    """
+    Add a product to the customer's wishlist, or remove it if it is already
+    there, in one statement. Returns True when the product was added.
+    """
+    added = not in_wishlist(user, product_id)
+    if added:
+        # A concurrent add of the same row is not an error
+        WishlistItem.objects.bulk_create(
+            [WishlistItem(product_id=product_id, customer_id=user.pk)],
+            ignore_conflicts=True,
+        )
+    else:
+        WishlistItem.objects.filter(product_id=product_id, customer_id=user.pk).delete()
+    invalidate_wishlists([user.pk])
+    return added
+
+
+def invalidate_wishlists(user_ids):
+    keys = [wishlist_key(user_id) for user_id in user_ids]
+    invalidate_on_commit(lambda: cache.delete_many(keys))
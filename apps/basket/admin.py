@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import BasketLine, CustomerBasket
+
+
+class BasketLineInline(admin.TabularInline):
+    model = BasketLine
+    raw_id_fields = ["product"]
+    extra = 0
+
+
+@admin.register(CustomerBasket)
+class CustomerBasketAdmin(admin.ModelAdmin):
+    inlines = [BasketLineInline]
+    list_display = ["customer", "updated_at"]
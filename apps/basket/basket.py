@@ -2,8 +2,44 @@ from decimal import Decimal
 
 from store.models import Product
 from django.conf import settings
+from django.db import transaction
 
-from checkout.models import DeliveryOptions
+from checkout.reference import get_delivery_option
+
+from .models import BasketLine, CustomerBasket
+
+
+BASKET_ACTIONS = ("add", "update", "delete")
+
+
+class BasketOperationError(ValueError):
+    pass
+
+
+def parse_operations(operations):
+    """
+    Validate a list of {"action", "productid", "productqty"} operations and
+    return them as (action, product id, qty) tuples; qty is None for delete.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BasketOperationError("Expected a non-empty list of operations.")
+
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise BasketOperationError("Operation %s is not an object." % index)
+        action = operation.get("action")
+        if action not in BASKET_ACTIONS:
+            raise BasketOperationError("Operation %s has an unknown action." % index)
+        try:
+            product_id = int(operation.get("productid"))
+            qty = None if action == "delete" else int(operation.get("productqty"))
+        except (TypeError, ValueError):
+            raise BasketOperationError("Operation %s is missing a number." % index)
+        if qty is not None and qty < 1:
+            raise BasketOperationError("Operation %s has an invalid qty." % index)
+        parsed.append((action, product_id, qty))
+    return parsed
 
 
 class Basket:
@@ -18,23 +54,42 @@ class Basket:
         if "skey" not in request.session:
             basket = self.session["skey"] = {}
         self.basket = basket
+        self._lines = None
+        self._subtotal = None
+        self._delivery_price = None
 
     def __iter__(self):
         """
         Collect the product_id in the session data to query the database
         and return products
         """
-        product_ids = self.basket.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        basket = self.basket.copy()
-
-        for product in products:
-            basket[str(product.id)]["product"] = product
+        return iter(self.get_lines())
 
-        for item in basket.values():
-            item["price"] = Decimal(item["price"])
-            item["total_price"] = item["price"] * item["qty"]
-            yield item
+    def get_lines(self):
+        """
+        Resolve the basket lines with their products and line totals in a
+        single query, cached until the basket is changed.
+        """
+        if self._lines is None:
+            products = Product.objects.with_feature_image().in_bulk(
+                map(int, self.basket.keys())
+            )
+            lines = []
+            for product_id, item in self.basket.items():
+                product = products.get(int(product_id))
+                if product is None:
+                    continue
+                price = Decimal(item["price"])
+                lines.append(
+                    {
+                        "product": product,
+                        "price": price,
+                        "qty": item["qty"],
+                        "total_price": price * item["qty"],
+                    }
+                )
+            self._lines = lines
+        return self._lines
 
     def __len__(self):
         """
@@ -74,27 +129,68 @@ class Basket:
             del self.basket[product_id]
             print(product_id)
             self.save()
+
+    def apply(self, operations, products):
+        """
+        Apply parsed operations in order and save once. products maps the
+        ids of every added product to its Product.
+        """
+        for action, product_id, qty in operations:
+            key = str(product_id)
+            if action == "add":
+                if key in self.basket:
+                    self.basket[key]["qty"] = qty
+                else:
+                    price = str(products[product_id].regular_price)
+                    self.basket[key] = {"price": price, "qty": qty}
+            elif action == "update":
+                if key in self.basket:
+                    self.basket[key]["qty"] = qty
+            else:
+                self.basket.pop(key, None)
+        self.save()
+
+    def get_state(self):
+        """
+        Return the basket as plain data for JSON responses, priced from the
+        stored line prices without fetching products.
+        """
+        return {
+            "qty": len(self),
+            "subtotal": self.get_subtotal_price(),
+            "delivery_price": self.get_delivery_price(),
+            "total": self.get_total_price(),
+            "lines": [
+                {
+                    "productid": int(product_id),
+                    "price": item["price"],
+                    "qty": item["qty"],
+                    "total_price": Decimal(item["price"]) * item["qty"],
+                }
+                for product_id, item in self.basket.items()
+            ],
+        }
     
     def get_subtotal_price(self):
-        return sum(Decimal(item["price"]) * item["qty"] for item in self.basket.values())
+        if self._subtotal is None:
+            self._subtotal = sum(
+                Decimal(item["price"]) * item["qty"] for item in self.basket.values()
+            )
+        return self._subtotal
 
     def get_total_price(self):
-        newprice = 0.00
-        subtotal = sum(Decimal(item["price"]) * item["qty"] for item in self.basket.values())
-
-        if "purchase" in self.session:
-            newprice = DeliveryOptions.objects.get(id=self.session["purchase"]["delivery_id"]).delivery_price
-
-        total = subtotal + Decimal(newprice)
+        total = self.get_subtotal_price() + Decimal(self.get_delivery_price())
         return total
 
     def get_delivery_price(self):
-        newprice = 0.00
+        if self._delivery_price is None:
+            newprice = 0.00
 
-        if "purchase" in self.session:
-            newprice = DeliveryOptions.objects.get(id=self.session["purchase"]["delivery_id"]).delivery_price
+            if "purchase" in self.session:
+                newprice = get_delivery_option(self.session["purchase"]["delivery_id"]).delivery_price
 
-        return newprice
+            self._delivery_price = newprice
+        return self._delivery_price
 
     def basket_update_delivery(self, deliveryprice=0):
         subtotal = sum(Decimal(item["price"]) * item["qty"] for item in self.basket.values())
@@ -112,4 +208,175 @@ class Basket:
         self.save()
     
     def save(self):
+        self._lines = self._subtotal = self._delivery_price = None
         self.session.modified = True
+
+
+class PersistentBasket(Basket):
+    """
+    A Basket stored in the database for a signed in customer.
+
+    Every change is a single row INSERT/UPDATE/DELETE on BasketLine instead
+    of rewriting the session, and the basket follows the customer across
+    devices. Checkout state ("purchase", "address") stays in the session.
+    """
+
+    def __init__(self, request):
+        self.session = request.session
+        self.customer = request.user
+        self.basket = {
+            str(product_id): {"price": str(price), "qty": qty}
+            for product_id, price, qty in BasketLine.objects.filter(
+                basket__customer=self.customer
+            ).values_list("product_id", "price", "qty")
+        }
+        self._basket_id = None
+        self._lines = None
+        self._subtotal = None
+        self._delivery_price = None
+
+    def get_basket_id(self):
+        if self._basket_id is None:
+            saved, created = CustomerBasket.objects.get_or_create(
+                customer=self.customer
+            )
+            self._basket_id = saved.id
+        return self._basket_id
+
+    def lines(self):
+        return BasketLine.objects.filter(basket__customer=self.customer)
+
+    def add(self, product, qty):
+        product_id = str(product.id)
+
+        if product_id in self.basket and self.lines().filter(
+            product_id=product.id
+        ).update(qty=qty):
+            self.basket[product_id]["qty"] = qty
+        else:
+            # Another tab or device may have added the line since this
+            # request read the basket
+            BasketLine.objects.update_or_create(
+                basket_id=self.get_basket_id(),
+                product_id=product.id,
+                defaults={"price": product.regular_price, "qty": qty},
+            )
+            self.basket[product_id] = {"price": str(product.regular_price), "qty": qty}
+
+        self.save()
+
+    def update(self, product, qty):
+        product_id = str(product)
+        if product_id in self.basket:
+            self.lines().filter(product_id=product).update(qty=qty)
+            self.basket[product_id]["qty"] = qty
+        self.save()
+
+    def delete(self, product):
+        product_id = str(product)
+
+        if product_id in self.basket:
+            self.lines().filter(product_id=product).delete()
+            del self.basket[product_id]
+            self.save()
+
+    def apply(self, operations, products):
+        before = {key: dict(item) for key, item in self.basket.items()}
+        super().apply(operations, products)
+
+        removed = [int(key) for key in before if key not in self.basket]
+        added = [
+            BasketLine(
+                basket_id=self.get_basket_id(),
+                product_id=int(key),
+                price=item["price"],
+                qty=item["qty"],
+            )
+            for key, item in self.basket.items()
+            if key not in before
+        ]
+        changed = {
+            int(key): item
+            for key, item in self.basket.items()
+            if key not in before or before[key] != item
+        }
+
+        with transaction.atomic():
+            if removed:
+                self.lines().filter(product_id__in=removed).delete()
+            if added:
+                # A concurrent request may have added the same products;
+                # their lines are brought up to date with the changed ones
+                BasketLine.objects.bulk_create(added, ignore_conflicts=True)
+            if changed:
+                lines = []
+                for line in self.lines().filter(product_id__in=changed):
+                    item = changed[line.product_id]
+                    if (str(line.price), line.qty) != (str(item["price"]), item["qty"]):
+                        line.price = item["price"]
+                        line.qty = item["qty"]
+                        lines.append(line)
+                if lines:
+                    BasketLine.objects.bulk_update(lines, ["price", "qty"])
+
+    def clear(self):
+        self.lines().delete()
+        self.basket = {}
+        for key in ("skey", "address", "purchase"):
+            self.session.pop(key, None)
+        self.save()
+
+    def save(self):
+        self._lines = self._subtotal = self._delivery_price = None
+
+
+def merge_session_basket(request, user):
+    """
+    Move the anonymous session basket into the customer's saved basket.
+    Quantities from the session win, as they are the most recent choice.
+    """
+    items = request.session.pop("skey", None)
+    if not items:
+        return
+
+    with transaction.atomic():
+        saved, created = CustomerBasket.objects.get_or_create(customer=user)
+        existing = {line.product_id: line for line in saved.lines.all()}
+        new_lines = []
+        changed = []
+        for product_id, item in items.items():
+            line = existing.get(int(product_id))
+            if line is None:
+                new_lines.append(
+                    BasketLine(
+                        basket=saved,
+                        product_id=int(product_id),
+                        price=item["price"],
+                        qty=item["qty"],
+                    )
+                )
+            elif line.qty != item["qty"]:
+                line.qty = item["qty"]
+                changed.append(line)
+        product_ids = set(
+            Product.objects.filter(
+                id__in=[line.product_id for line in new_lines]
+            ).values_list("id", flat=True)
+        )
+        BasketLine.objects.bulk_create(
+            line for line in new_lines if line.product_id in product_ids
+        )
+        BasketLine.objects.bulk_update(changed, ["qty"])
+
+
+def get_basket(request):
+    """
+    Return the basket for this request, creating it at most once.
+    """
+    if not hasattr(request, "_cached_basket"):
+        user = getattr(request, "user", None)
+        if settings.BASKET_PERSISTENT and user is not None and user.is_authenticated:
+            request._cached_basket = PersistentBasket(request)
+        else:
+            request._cached_basket = Basket(request)
+    return request._cached_basket
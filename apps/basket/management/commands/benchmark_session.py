@@ -0,0 +1,71 @@
+import random
+import timeit
+import uuid
+
+from django.core import signing
+from django.core.management.base import BaseCommand
+
+from basket.serializers import PackedSessionSerializer
+
+
+def sample_session(lines):
+    rng = random.Random(lines)
+    return {
+        "_auth_user_id": "1",
+        "_auth_user_backend": "django.contrib.auth.backends.ModelBackend",
+        "_auth_user_hash": "0" * 64,
+        "skey": {
+            str(rng.randrange(1, 100000)): {
+                "price": "%d.%02d" % (rng.randrange(5, 200), rng.randrange(100)),
+                "qty": rng.randrange(1, 6),
+            }
+            for i in range(lines)
+        },
+        "purchase": {"delivery_id": 2},
+        "address": {"address_id": str(uuid.uuid4())},
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare the packed session serializer with Django's JSON serializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 100, 500])
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        serializers = [
+            ("json", signing.JSONSerializer),
+            ("packed", PackedSessionSerializer),
+        ]
+        self.stdout.write(
+            "%6s %-7s %8s %8s %10s %10s"
+            % ("lines", "format", "raw", "stored", "dumps us", "loads us")
+        )
+        for lines in options["lines"]:
+            session = sample_session(lines)
+            for name, serializer in serializers:
+                raw = serializer().dumps(session)
+                stored = signing.dumps(
+                    session, salt="benchmark", serializer=serializer, compress=True
+                )
+                assert serializer().loads(raw) == session
+
+                iterations = options["iterations"]
+                dumps = timeit.timeit(
+                    lambda: serializer().dumps(session), number=iterations
+                )
+                loads = timeit.timeit(
+                    lambda: serializer().loads(raw), number=iterations
+                )
+                self.stdout.write(
+                    "%6s %-7s %8s %8s %10.1f %10.1f"
+                    % (
+                        lines,
+                        name,
+                        len(raw),
+                        len(stored),
+                        dumps / iterations * 1e6,
+                        loads / iterations * 1e6,
+                    )
+                )
@@ -0,0 +1,51 @@
+# Generated by Django 4.0.1 on 2026-10-18 18:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('store', '0004_product_feature_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerBasket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='saved_basket', to=settings.AUTH_USER_MODEL, verbose_name='Customer')),
+            ],
+            options={
+                'verbose_name': 'Customer Basket',
+                'verbose_name_plural': 'Customer Baskets',
+            },
+        ),
+        migrations.CreateModel(
+            name='BasketLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('qty', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('basket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='basket.customerbasket')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='store.product')),
+            ],
+            options={
+                'verbose_name': 'Basket Line',
+                'verbose_name_plural': 'Basket Lines',
+                'ordering': ('created_at', 'id'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='basketline',
+            constraint=models.UniqueConstraint(fields=('basket', 'product'), name='unique_basket_product'),
+        ),
+    ]
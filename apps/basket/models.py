@@ -1,3 +1,54 @@
+from django.conf import settings
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from store.models import Product
+
+
+class CustomerBasket(models.Model):
+    """
+    The saved basket of a signed in customer.
+    """
+
+    customer = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("Customer"),
+        on_delete=models.CASCADE,
+        related_name="saved_basket",
+    )
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Customer Basket")
+        verbose_name_plural = _("Customer Baskets")
+
+    def __str__(self):
+        return str(self.customer)
+
+
+class BasketLine(models.Model):
+    """
+    One product in a saved basket, at the price it was added for.
+    """
+
+    basket = models.ForeignKey(
+        CustomerBasket, on_delete=models.CASCADE, related_name="lines"
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    price = models.DecimalField(max_digits=5, decimal_places=2)
+    qty = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Basket Line")
+        verbose_name_plural = _("Basket Lines")
+        ordering = ("created_at", "id")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["basket", "product"], name="unique_basket_product"
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.product_id)
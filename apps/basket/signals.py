@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from .basket import merge_session_basket
+
+
+@receiver(user_logged_in)
+def merge_basket_on_login(sender, request, user, **kwargs):
+    if settings.BASKET_PERSISTENT and request is not None:
+        merge_session_basket(request, user)
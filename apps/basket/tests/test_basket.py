@@ -0,0 +1,96 @@
+from decimal import Decimal
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from basket.basket import get_basket
+from checkout.models import DeliveryOptions
+from store.models import Category, Product, ProductType
+
+
+class TestRequestBasket(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.products = [
+            Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            for i in range(3)
+        ]
+        self.delivery = DeliveryOptions.objects.create(
+            delivery_name="next day",
+            delivery_price="11.50",
+            delivery_method="HD",
+            delivery_timeframe="1 day",
+            delivery_window="9-5",
+        )
+        self.request = RequestFactory().get("/")
+        self.request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+
+    def test_basket_is_request_scoped(self):
+        """
+        Test every caller in a request shares one basket object
+        """
+        self.assertIs(get_basket(self.request), get_basket(self.request))
+
+    def test_lines_resolved_once(self):
+        """
+        Test iterating the basket repeatedly runs a single product query
+        """
+        basket = get_basket(self.request)
+        basket.add(self.products[0], 2)
+        basket.add(self.products[1], 1)
+        self.request.session["purchase"] = {"delivery_id": self.delivery.id}
+
+        with self.assertNumQueries(2):
+            lines = list(basket)
+            list(basket)
+            basket.get_total_price()
+            basket.get_delivery_price()
+            basket.get_total_price()
+
+        self.assertEqual([line["qty"] for line in lines], [2, 1])
+        self.assertEqual(lines[0]["total_price"], Decimal("40.00"))
+        self.assertEqual(basket.get_total_price(), Decimal("71.50"))
+        session_item = self.request.session["skey"][str(self.products[0].id)]
+        self.assertIsInstance(session_item["price"], str)
+
+    def test_changes_refresh_cached_totals(self):
+        """
+        Test updating the basket invalidates the cached lines and totals
+        """
+        basket = get_basket(self.request)
+        basket.add(self.products[0], 1)
+        self.assertEqual(basket.get_subtotal_price(), Decimal("20.00"))
+        basket.update(self.products[0].id, 3)
+        self.assertEqual(basket.get_subtotal_price(), Decimal("60.00"))
+        basket.delete(self.products[0].id)
+        self.assertEqual(list(basket), [])
+
+    def test_summary_page_queries(self):
+        """
+        Test the summary page resolves the basket products once
+        """
+        for product in self.products:
+            self.client.post(
+                reverse("basket:basket_add"),
+                {"productid": product.id, "productqty": 1, "action": "post"},
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("basket:basket_summary"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["basket"]), 3)
+        product_queries = [
+            query for query in queries if 'FROM "store_product"' in query["sql"]
+        ]
+        self.assertEqual(len(product_queries), 1)
@@ -0,0 +1,113 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from basket.models import BasketLine
+from store.models import Category, Product, ProductType
+
+
+class TestBasketBatch(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.products = [
+            Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            for i in range(3)
+        ]
+
+    def operation(self, action, product, qty=None):
+        operation = {"action": action, "productid": getattr(product, "id", product)}
+        if qty is not None:
+            operation["productqty"] = qty
+        return operation
+
+    def batch(self, operations):
+        return self.client.post(
+            reverse("basket:basket_batch"),
+            json.dumps({"operations": operations}),
+            content_type="application/json",
+        )
+
+    def test_operations_applied_in_one_request(self):
+        """
+        Test operations are applied in order with one product query and one
+        session write
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.batch(
+                [
+                    self.operation("add", self.products[0], 1),
+                    self.operation("add", self.products[1], 1),
+                    self.operation("add", self.products[2], 1),
+                    self.operation("update", self.products[0], 4),
+                    self.operation("delete", self.products[1]),
+                ]
+            )
+        statements = [query["sql"] for query in queries]
+        self.assertEqual(len([sql for sql in statements if "store_product" in sql]), 1)
+        self.assertEqual(
+            len([sql for sql in statements if sql.startswith(("INSERT", "UPDATE"))]),
+            1,
+        )
+        state = response.json()
+        self.assertEqual(state["qty"], 5)
+        self.assertEqual(state["subtotal"], "100.00")
+        self.assertEqual(
+            [(line["productid"], line["qty"]) for line in state["lines"]],
+            [(self.products[0].id, 4), (self.products[2].id, 1)],
+        )
+
+    def test_invalid_batch_changes_nothing(self):
+        """
+        Test a batch with one bad operation is rejected as a whole
+        """
+        self.batch([self.operation("add", self.products[0], 1)])
+        for operations in [
+            [
+                self.operation("delete", self.products[0]),
+                self.operation("add", 9999, 1),
+            ],
+            [
+                self.operation("delete", self.products[0]),
+                self.operation("update", self.products[0], 0),
+            ],
+            [self.operation("empty", self.products[0])],
+            [],
+        ]:
+            self.assertEqual(self.batch(operations).status_code, 400)
+
+        response = self.client.get(reverse("basket:basket_state"))
+        self.assertEqual(response.json(), {"qty": 1})
+
+    def test_saved_basket(self):
+        """
+        Test a signed in customer's batch is written to the saved basket
+        """
+        user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        self.client.force_login(user)
+        self.batch([self.operation("add", self.products[0], 1)])
+        self.batch(
+            [
+                self.operation("update", self.products[0], 2),
+                self.operation("add", self.products[1], 3),
+                self.operation("add", self.products[2], 1),
+                self.operation("delete", self.products[2]),
+            ]
+        )
+        self.assertEqual(
+            dict(BasketLine.objects.values_list("product_id", "qty")),
+            {self.products[0].id: 2, self.products[1].id: 3},
+        )
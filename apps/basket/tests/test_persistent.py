@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from basket.basket import PersistentBasket
+from basket.models import BasketLine, CustomerBasket
+from store.models import Category, Product, ProductType
+
+
+class TestPersistentBasket(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.products = [
+            Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            for i in range(3)
+        ]
+        self.user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+
+    def add(self, product, qty):
+        return self.client.post(
+            reverse("basket:basket_add"),
+            {"productid": product.id, "productqty": qty, "action": "post"},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+    def test_signed_in_basket_is_saved(self):
+        """
+        Test a signed in customer's basket lives in the database
+        """
+        self.client.force_login(self.user)
+        self.add(self.products[0], 2)
+        self.add(self.products[0], 3)
+        self.add(self.products[1], 1)
+
+        lines = BasketLine.objects.filter(basket__customer=self.user)
+        self.assertEqual(
+            list(lines.values_list("product_id", "qty")),
+            [(self.products[0].id, 3), (self.products[1].id, 1)],
+        )
+        self.assertNotIn("skey", self.client.session)
+
+    def test_basket_follows_customer(self):
+        """
+        Test a new session sees the basket saved by an earlier one
+        """
+        self.client.force_login(self.user)
+        self.add(self.products[0], 2)
+        self.client.logout()
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("basket:basket_state"))
+        self.assertEqual(response.json(), {"qty": 2})
+
+    def test_update_and_delete(self):
+        """
+        Test updating and deleting touch a single line
+        """
+        self.client.force_login(self.user)
+        self.add(self.products[0], 2)
+        self.add(self.products[1], 1)
+        headers = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+        self.client.post(
+            reverse("basket:basket_update"),
+            {"productid": self.products[0].id, "productqty": 5, "action": "post"},
+            **headers,
+        )
+        self.client.post(
+            reverse("basket:basket_delete"),
+            {"productid": self.products[1].id, "action": "post"},
+            **headers,
+        )
+        self.assertEqual(
+            list(BasketLine.objects.values_list("product_id", "qty")),
+            [(self.products[0].id, 5)],
+        )
+
+    def test_concurrent_adds(self):
+        """
+        Test two requests adding the same product from the same snapshot of
+        the basket do not collide on the unique line
+        """
+        request = SimpleNamespace(session={}, user=self.user)
+        first, second, third = (PersistentBasket(request) for _ in range(3))
+        first.add(self.products[0], 1)
+        second.add(self.products[0], 2)
+        third.apply(
+            [("add", self.products[0].id, 4), ("add", self.products[1].id, 1)],
+            {product.id: product for product in self.products},
+        )
+        self.assertEqual(
+            dict(BasketLine.objects.values_list("product_id", "qty")),
+            {self.products[0].id: 4, self.products[1].id: 1},
+        )
+
+    def test_session_basket_merged_on_login(self):
+        """
+        Test logging in moves the anonymous basket into the saved one
+        """
+        basket = CustomerBasket.objects.create(customer=self.user)
+        BasketLine.objects.create(
+            basket=basket, product=self.products[0], price="20.00", qty=1
+        )
+        BasketLine.objects.create(
+            basket=basket, product=self.products[2], price="20.00", qty=4
+        )
+
+        self.add(self.products[0], 3)
+        self.add(self.products[1], 2)
+        self.client.login(username="a@a.com", password="password")
+
+        self.assertEqual(
+            dict(basket.lines.values_list("product_id", "qty")),
+            {self.products[0].id: 3, self.products[1].id: 2, self.products[2].id: 4},
+        )
+        self.assertNotIn("skey", self.client.session)
@@ -0,0 +1,62 @@
+import uuid
+
+from django.core import signing
+from django.test import SimpleTestCase
+
+from basket.serializers import PackedSessionSerializer
+
+
+class TestPackedSessionSerializer(SimpleTestCase):
+    def setUp(self):
+        self.serializer = PackedSessionSerializer()
+        self.session = {
+            "_auth_user_id": "1",
+            "skey": {
+                str(i): {"price": "%d.%02d" % (i, i % 100), "qty": i % 7 + 1}
+                for i in range(1, 200)
+            },
+            "purchase": {"delivery_id": 3},
+            "address": {"address_id": str(uuid.uuid4())},
+        }
+
+    def test_round_trip(self):
+        """
+        Test basket and checkout keys come back unchanged
+        """
+        data = self.serializer.dumps(self.session)
+        self.assertEqual(self.serializer.loads(data), self.session)
+
+    def test_smaller_than_json(self):
+        """
+        Test a large basket packs smaller than JSON, before and after signing
+        """
+        packed = self.serializer.dumps(self.session)
+        plain = signing.JSONSerializer().dumps(self.session)
+        self.assertLess(len(packed), len(plain) / 2)
+        self.assertLess(
+            len(signing.dumps(self.session, serializer=PackedSessionSerializer)),
+            len(signing.dumps(self.session)),
+        )
+
+    def test_unexpected_shapes_kept_as_json(self):
+        """
+        Test values that would not survive packing are stored as JSON
+        """
+        for session in [
+            {"skey": {"1": {"price": "1.5", "qty": 1}}},
+            {"skey": {"01": {"price": "1.50", "qty": 1}}},
+            {"skey": {"1": {"price": "1.50", "qty": True}}},
+            {"skey": {"1": {"price": "1.50", "qty": 2**40}}},
+            {"skey": {"1": {"price": "1.50", "qty": 1, "note": ""}}},
+            {"purchase": {"delivery_id": "3"}},
+            {"address": {"address_id": "not-a-uuid"}},
+        ]:
+            data = self.serializer.dumps(session)
+            self.assertEqual(self.serializer.loads(data), session)
+
+    def test_reads_json_sessions(self):
+        """
+        Test sessions written by the JSON serializer are still readable
+        """
+        data = signing.JSONSerializer().dumps(self.session)
+        self.assertEqual(self.serializer.loads(data), self.session)
@@ -6,7 +6,9 @@ app_name = "basket"
 
 urlpatterns = [
     path("", views.BasketSummary.as_view(), name="basket_summary"),
+    path("state/", views.BasketState.as_view(), name="basket_state"),
     path("add/", views.BasketAdd.as_view(), name="basket_add"),
     path("update/", views.BasketUpdate.as_view(), name="basket_update"),
     path("delete/", views.BasketDelete.as_view(), name="basket_delete"),
+    path("batch/", views.BasketBatch.as_view(), name="basket_batch"),
 ]
@@ -1,12 +1,17 @@
+import json
+
 from django.http import HttpResponseRedirect
 from django.http.response import JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls.base import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.generic import TemplateView, View
 
 from store.models import Product
 
-from .basket import Basket
+from .basket import BasketOperationError, get_basket, parse_operations
 
 
 class BasketSummary(TemplateView):
@@ -16,17 +21,28 @@ class BasketSummary(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        basket = Basket(self.request)
+        basket = get_basket(self.request)
         context["basket"] = basket
         return context
 
 
+@method_decorator([never_cache, ensure_csrf_cookie], name="dispatch")
+class BasketState(View):
+    """
+    Return the visitor specific bits left out of cached catalog pages.
+    """
+
+    def get(self, request):
+        basket = get_basket(request)
+        return JsonResponse({"qty": len(basket)})
+
+
 class BasketAdd(View):
     def get(self, request):
         return HttpResponseRedirect(reverse("basket:basket_summary"))
 
     def post(self, request):
-        basket = Basket(request)
+        basket = get_basket(request)
 
         if request.POST.get("action") == "post":
             product_id = int(request.POST.get("productid"))
@@ -44,7 +60,7 @@ class BasketUpdate(View):
         return HttpResponseRedirect(reverse("basket:basket_summary"))
 
     def post(self, request):
-        basket = Basket(request)
+        basket = get_basket(request)
 
         if request.POST.get("action") == "post":
             product_id = int(request.POST.get("productid"))
@@ -62,7 +78,7 @@ class BasketDelete(View):
         return HttpResponseRedirect(reverse("basket:basket_summary"))
 
     def post(self, request):
-        basket = Basket(request)
+        basket = get_basket(request)
 
         if request.POST.get("action") == "post":
             product_id = int(request.POST.get("productid"))
@@ -72,3 +88,38 @@ class BasketDelete(View):
             baskettotal = basket.get_total_price()
             response = JsonResponse({"qty": basketqty, "subtotal": baskettotal})
             return response
+
+
+class BasketBatch(View):
+    """
+    Apply several add/update/delete operations in one request.
+
+    The body is JSON: {"operations": [{"action": "update", "productid": 1,
+    "productqty": 2}, ...]}. Every operation is validated before any is
+    applied, so a bad request leaves the basket untouched. The response is
+    the full recalculated basket.
+    """
+
+    def post(self, request):
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON."}, status=400)
+        try:
+            operations = parse_operations(
+                body.get("operations") if isinstance(body, dict) else None
+            )
+        except BasketOperationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        added = {product_id for action, product_id, _ in operations if action == "add"}
+        products = Product.objects.in_bulk(added)
+        missing = added - set(products)
+        if missing:
+            return JsonResponse(
+                {"error": "Unknown products: %s." % sorted(missing)}, status=400
+            )
+
+        basket = get_basket(request)
+        basket.apply(operations, products)
+        return JsonResponse(basket.get_state())
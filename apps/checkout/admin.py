@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from .models import DeliveryOptions
+from .models import DeliveryOptions, PaymentSelections
 
-admin.site.register(DeliveryOptions)
\ No newline at end of file
+admin.site.register(DeliveryOptions)
+admin.site.register(PaymentSelections)
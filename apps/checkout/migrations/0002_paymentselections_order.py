@@ -0,0 +1,18 @@
+# Generated by Django 4.0.1 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentselections',
+            name='order',
+            field=models.IntegerField(default=0, help_text='Required', verbose_name='list order'),
+        ),
+    ]
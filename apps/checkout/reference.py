@@ -0,0 +1,71 @@
+from django.core.cache import cache
+
+from core.helpers import bump_version, get_version, invalidate_on_commit
+
+from .models import DeliveryOptions, PaymentSelections
+
+REFERENCE_NAMESPACE = "checkout:reference"
+
+_local = {"version": None, "delivery": None, "payment": None}
+
+
+def _load(name, queryset):
+    """
+    Return one reference table for the current version, read from the
+    database at most once per version across all processes.
+    """
+    version = get_version(REFERENCE_NAMESPACE)
+    if _local["version"] != version:
+        _local["version"], _local["delivery"], _local["payment"] = version, None, None
+
+    if _local[name] is None:
+        key = "%s:%s:%s" % (REFERENCE_NAMESPACE, name, version)
+        rows = cache.get(key)
+        if rows is None:
+            rows = tuple(queryset.order_by("order", "id"))
+            cache.set(key, rows, timeout=None)
+        _local[name] = rows
+    return _local[name]
+
+
+def get_delivery_options():
+    """
+    Return the active delivery options in list order. The instances are
+    shared by every request in the process and must not be modified.
+    """
+    return [
+        option
+        for option in _load("delivery", DeliveryOptions.objects)
+        if option.is_active
+    ]
+
+
+def get_delivery_option(option_id):
+    """
+    Return a delivery option by id, including inactive ones so a basket
+    keeps its price if an option is withdrawn during checkout.
+    """
+    for option in _load("delivery", DeliveryOptions.objects):
+        if option.id == option_id:
+            return option
+    raise DeliveryOptions.DoesNotExist(option_id)
+
+
+def get_payment_selections():
+    """
+    Return the active payment selections in list order.
+    """
+    return [
+        selection
+        for selection in _load("payment", PaymentSelections.objects)
+        if selection.is_active
+    ]
+
+
+def _bump_reference_data():
+    bump_version(REFERENCE_NAMESPACE)
+    _local["version"] = _local["delivery"] = _local["payment"] = None
+
+
+def invalidate_reference_data():
+    invalidate_on_commit(_bump_reference_data)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DeliveryOptions, PaymentSelections
+from .reference import invalidate_reference_data
+
+
+@receiver(post_save, sender=DeliveryOptions)
+@receiver(post_delete, sender=DeliveryOptions)
+@receiver(post_save, sender=PaymentSelections)
+@receiver(post_delete, sender=PaymentSelections)
+def reference_data_changed(sender, **kwargs):
+    invalidate_reference_data()
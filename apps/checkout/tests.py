@@ -1,3 +1,85 @@
 from django.test import TestCase
 
-# Create your tests here.
+from checkout.models import DeliveryOptions, PaymentSelections
+from checkout.reference import (
+    REFERENCE_NAMESPACE,
+    get_delivery_option,
+    get_delivery_options,
+    get_payment_selections,
+)
+from core.helpers import get_version
+
+
+class TestReferenceData(TestCase):
+    def setUp(self):
+        self.options = [
+            DeliveryOptions.objects.create(
+                delivery_name=name,
+                delivery_price=price,
+                delivery_method="HD",
+                delivery_timeframe="1 day",
+                delivery_window="9-5",
+                order=order,
+                is_active=is_active,
+            )
+            for name, price, order, is_active in [
+                ("standard", "4.50", 2, True),
+                ("next day", "11.50", 1, True),
+                ("courier", "20.00", 0, False),
+            ]
+        ]
+        PaymentSelections.objects.create(name="card", order=1)
+        PaymentSelections.objects.create(name="paypal", order=0)
+
+    def test_active_options_in_order(self):
+        """
+        Test only active options are listed, in list order
+        """
+        self.assertEqual(
+            [option.delivery_name for option in get_delivery_options()],
+            ["next day", "standard"],
+        )
+        self.assertEqual(
+            [selection.name for selection in get_payment_selections()],
+            ["paypal", "card"],
+        )
+
+    def test_lookups_skip_the_database(self):
+        """
+        Test the options are read from the database once
+        """
+        get_delivery_options()
+        with self.assertNumQueries(0):
+            get_delivery_options()
+            option = get_delivery_option(self.options[2].id)
+        self.assertEqual(option.delivery_name, "courier")
+        with self.assertRaises(DeliveryOptions.DoesNotExist):
+            get_delivery_option(9999)
+
+    def test_invalidated_on_save(self):
+        """
+        Test admin changes are visible on the next lookup
+        """
+        get_delivery_options()
+        option = self.options[0]
+        option.delivery_price = "5.00"
+        option.save()
+        self.assertEqual(str(get_delivery_option(option.id).delivery_price), "5.00")
+
+        self.options[1].delete()
+        self.assertEqual(
+            [option.delivery_name for option in get_delivery_options()], ["standard"]
+        )
+
+    def test_invalidated_again_on_commit(self):
+        """
+        Test a change retires the options once more after its transaction
+        commits, dropping any copy built from the uncommitted rows
+        """
+        option = self.options[0]
+        option.delivery_price = "5.00"
+        with self.captureOnCommitCallbacks(execute=True):
+            option.save()
+            version = get_version(REFERENCE_NAMESPACE)
+            get_delivery_options()
+        self.assertGreater(get_version(REFERENCE_NAMESPACE), version)
@@ -4,10 +4,10 @@ import json
 
 from account.models import Address
 from django.contrib import messages
-from basket.basket import Basket
+from basket.basket import get_basket
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import HttpResponseRedirect, JsonResponse
-from .models import DeliveryOptions
+from .reference import get_delivery_option, get_delivery_options
 from django.views.generic import (
     FormView,
     TemplateView,
@@ -24,15 +24,14 @@ class DeliveryChoices(LoginRequiredMixin, ListView):
     context_object_name = 'deliveryoptions'
 
     def get_queryset(self):
-        queryset = DeliveryOptions.objects.filter(is_active=True)
-        return queryset
+        return get_delivery_options()
 
 class BasketUpdateDelivery(LoginRequiredMixin, View):
     def post(self, request, *args):
-        basket = Basket(request)
+        basket = get_basket(request)
         if request.POST.get('action') == 'post':
             delivery_option = int(request.POST.get("deliveryoption"))
-            delivery_type = DeliveryOptions.objects.get(id=delivery_option)
+            delivery_type = get_delivery_option(delivery_option)
             updated_total_price = basket.basket_update_delivery(delivery_type.delivery_price)
 
             session = request.session
@@ -125,7 +124,7 @@ class PaymentSuccessful(LoginRequiredMixin, TemplateView):
     template_name = 'checkout/payment_successful.html'
 
     def get(self, request, *args, **kwargs):
-        basket = Basket(request)
+        basket = get_basket(request)
         basket.clear()
 
         return super().get(request, *args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["name", "status", "attempts", "run_at", "updated_at"]
+    list_filter = ["status", "name"]
+    readonly_fields = ["locked_by", "locked_at", "last_error", "created_at"]
+    actions = ["retry"]
+
+    @admin.action(description="Run again now")
+    def retry(self, request, queryset):
+        queryset.update(status=Job.QUEUED, run_at=timezone.now(), attempts=0)
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import claim, run, worker_name
+
+
+class Command(BaseCommand):
+    help = "Run queued jobs with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0, help="Seconds between polls."
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no job is due."
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        threads = options["threads"]
+        succeeded = failed = 0
+        running = set()
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                free = threads - len(running)
+                for job in claim(free, worker) if free else []:
+                    running.add(executor.submit(run, job))
+
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                # With a free thread, look for newly due jobs every poll
+                timeout = options["poll_interval"] if len(running) < threads else None
+                done, running = wait(running, timeout, FIRST_COMPLETED)
+                for future in done:
+                    if future.result():
+                        succeeded += 1
+                    else:
+                        failed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS("Ran %s jobs, %s failed." % (succeeded + failed, failed))
+        )
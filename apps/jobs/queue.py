@@ -0,0 +1,162 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.routers import reset_pinning, restore_pinning
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class UnknownJob(Exception):
+    pass
+
+
+def job(name=None, max_attempts=5):
+    """
+    Register a function as a job. Its keyword arguments are stored as the
+    job payload, so they must be JSON serializable.
+
+    Jobs are retried when they raise, and one still running after
+    JOBS_LOCK_TIMEOUT is claimed again, so a job must be safe to run more
+    than once. Raise, rather than return, when a row the job needs is
+    missing: it may not have reached this worker's database yet.
+    """
+
+    def register(func):
+        job_name = name or "%s.%s" % (func.__module__, func.__name__)
+        _registry[job_name] = (func, max_attempts)
+        func.job_name = job_name
+        return func
+
+    return register
+
+
+def enqueue(func_or_name, run_at=None, **payload):
+    """
+    Queue a registered job. The row is written in the caller's transaction,
+    so a job is only visible to workers once the work that queued it has
+    committed.
+
+    With JOBS_ALWAYS_EAGER the job runs immediately instead, in process.
+    """
+    name = getattr(func_or_name, "job_name", func_or_name)
+    if name not in _registry:
+        raise UnknownJob(name)
+    func, max_attempts = _registry[name]
+
+    if getattr(settings, "JOBS_ALWAYS_EAGER", False):
+        func(**payload)
+        return None
+
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def worker_name():
+    return "%s:%s:%s" % (socket.gethostname(), os.getpid(), threading.get_ident())
+
+
+def claimable():
+    """
+    Jobs that are due, plus running jobs whose worker stopped responding.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, "JOBS_LOCK_TIMEOUT", 300))
+    return Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_at__lt=stale)
+    )
+
+
+def claim(limit, worker):
+    """
+    Claim up to limit jobs for this worker.
+
+    Each job is taken with a conditional UPDATE that only succeeds while the
+    row still looks the way we read it, so two workers racing for the same
+    job cannot both win it.
+    """
+    claimed = []
+    candidates = claimable().values_list("id", "status", "locked_at")[: limit * 2]
+    for job_id, status, locked_at in candidates:
+        won = (
+            claimable()
+            .filter(id=job_id, status=status, locked_at=locked_at)
+            .update(
+                status=Job.RUNNING,
+                locked_by=worker,
+                locked_at=timezone.now(),
+                attempts=F("attempts") + 1,
+            )
+        )
+        if won:
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return list(Job.objects.filter(id__in=claimed))
+
+
+def backoff(attempts):
+    """
+    Seconds to wait before the next attempt, doubling each time.
+    """
+    return getattr(settings, "JOBS_BACKOFF_SECONDS", 10) * 2 ** (attempts - 1)
+
+
+def run(claimed):
+    """
+    Run a claimed job and record the outcome. Returns True on success.
+    """
+    close_old_connections()
+    # Read the rows the job was queued for from the primary; a replica may
+    # not have them yet
+    token = reset_pinning(True)
+    try:
+        if claimed.name not in _registry:
+            raise UnknownJob(claimed.name)
+        func, max_attempts = _registry[claimed.name]
+        func(**claimed.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if claimed.attempts >= claimed.max_attempts:
+            status, run_at = Job.FAILED, claimed.run_at
+            logger.error("job %s failed for good:\n%s", claimed, error)
+        else:
+            status = Job.QUEUED
+            run_at = timezone.now() + timedelta(seconds=backoff(claimed.attempts))
+            logger.warning(
+                "job %s failed, retrying at %s:\n%s", claimed, run_at, error
+            )
+        Job.objects.filter(id=claimed.id).update(
+            status=status,
+            run_at=run_at,
+            locked_by="",
+            locked_at=None,
+            last_error=error,
+            updated_at=timezone.now(),
+        )
+        return False
+    else:
+        Job.objects.filter(id=claimed.id).update(
+            status=Job.DONE, locked_by="", locked_at=None, updated_at=timezone.now()
+        )
+        return True
+    finally:
+        restore_pinning(token)
+        close_old_connections()
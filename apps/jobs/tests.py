@@ -0,0 +1,239 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.routers import is_pinned, reset_pinning, restore_pinning
+from jobs import queue
+from jobs.models import Job
+from orders.models import Order
+from orders.views import payment_confirmation
+
+calls = []
+
+
+@queue.job(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@queue.job(name="tests.pinned")
+def pinned():
+    calls.append(is_pinned())
+
+
+@queue.job(name="tests.explode", max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+class TestQueue(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """
+        Test a queued job is claimed once and marked done after it runs
+        """
+        job = queue.enqueue(record, value=1)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.payload, {"value": 1})
+
+        claimed = queue.claim(10, "worker")
+        self.assertEqual([j.id for j in claimed], [job.id])
+        self.assertEqual(claimed[0].status, Job.RUNNING)
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(queue.claim(10, "other"), [])
+
+        self.assertTrue(queue.run(claimed[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(calls, [1])
+
+    def test_jobs_read_from_primary(self):
+        """
+        Test jobs run pinned to the primary, and the pin is dropped after
+        """
+        queue.enqueue(pinned)
+        claimed = queue.claim(1, "worker")[0]
+        token = reset_pinning()
+        try:
+            queue.run(claimed)
+            self.assertEqual(calls, [True])
+            self.assertFalse(is_pinned())
+        finally:
+            restore_pinning(token)
+
+    def test_unknown_job(self):
+        """
+        Test only registered jobs can be queued
+        """
+        with self.assertRaises(queue.UnknownJob):
+            queue.enqueue("tests.missing")
+
+    def test_future_job_is_not_claimed(self):
+        """
+        Test a job waits until its run_at
+        """
+        queue.enqueue(record, run_at=timezone.now() + timedelta(hours=1), value=1)
+        self.assertEqual(queue.claim(10, "worker"), [])
+
+    def test_claim_is_conditional(self):
+        """
+        Test a worker cannot claim a job another worker took after it was read
+        """
+        job = queue.enqueue(record, value=1)
+        claimable = queue.claimable
+
+        def race():
+            # The first call lists candidates; before the update that
+            # follows, another worker takes the job.
+            if race.called:
+                Job.objects.filter(id=job.id).update(
+                    status=Job.RUNNING, locked_by="other", locked_at=timezone.now()
+                )
+            race.called = True
+            return claimable()
+
+        race.called = False
+        with mock.patch.object(queue, "claimable", race):
+            self.assertEqual(queue.claim(1, "worker"), [])
+        job.refresh_from_db()
+        self.assertEqual(job.locked_by, "other")
+
+    def test_stale_job_is_claimed_again(self):
+        """
+        Test a running job whose worker went away is picked up again
+        """
+        job = queue.enqueue(record, value=1)
+        Job.objects.filter(id=job.id).update(
+            status=Job.RUNNING,
+            locked_by="gone",
+            locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual([j.id for j in queue.claim(1, "worker")], [job.id])
+
+    @override_settings(JOBS_BACKOFF_SECONDS=10)
+    def test_retry_with_backoff_then_fail(self):
+        """
+        Test a failing job is retried later and fails after max_attempts
+        """
+        job = queue.enqueue(explode)
+        with self.assertLogs("jobs.queue", "WARNING"):
+            self.assertFalse(queue.run(queue.claim(1, "worker")[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(queue.claim(1, "worker"), [])
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        with self.assertLogs("jobs.queue", "ERROR"):
+            self.assertFalse(queue.run(queue.claim(1, "worker")[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_backoff_doubles(self):
+        """
+        Test the retry delay doubles with each attempt
+        """
+        with self.settings(JOBS_BACKOFF_SECONDS=10):
+            self.assertEqual(
+                [queue.backoff(n) for n in (1, 2, 3, 4)], [10, 20, 40, 80]
+            )
+
+    @override_settings(JOBS_ALWAYS_EAGER=True)
+    def test_eager(self):
+        """
+        Test eager mode runs the job in process without a row
+        """
+        self.assertIsNone(queue.enqueue(record, value=2))
+        self.assertEqual(calls, [2])
+        self.assertFalse(Job.objects.exists())
+
+
+class TestWorker(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_jobs_once(self):
+        """
+        Test the worker command runs every due job on its threads and exits
+        """
+        for value in range(5):
+            queue.enqueue(record, value=value)
+        out = StringIO()
+        call_command("run_jobs", "--once", "--threads", "2", stdout=out)
+        self.assertIn("Ran 5 jobs, 0 failed.", out.getvalue())
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 5)
+
+
+class TestQueuedEmails(TestCase):
+    def test_registration_email_is_queued(self):
+        """
+        Test registering queues the activation email instead of sending it
+        """
+        response = self.client.post(
+            reverse("account:register"),
+            {
+                "user_name": "reader",
+                "email": "reader@example.com",
+                "password": "password",
+                "password2": "password",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.name, "account.tasks.send_account_email")
+
+        queue.run(queue.claim(1, "worker")[0])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["reader@example.com"])
+        self.assertIn("/account/activate/", mail.outbox[0].body)
+
+    def test_payment_confirmation_is_queued(self):
+        """
+        Test payment confirmation marks the order paid from the worker
+        """
+        user = get_user_model().objects.create_user(
+            "buyer@example.com", "buyer", "password", is_active=True
+        )
+        order = Order.objects.create(
+            user=user,
+            full_name="Buyer",
+            address1="1 High Street",
+            address2="",
+            city="London",
+            phone="0123456789",
+            postal_code="AB1 2CD",
+            total_paid="20.00",
+            order_key="key",
+        )
+        payment_confirmation("key")
+        order.refresh_from_db()
+        self.assertFalse(order.billing_status)
+
+        queue.run(queue.claim(1, "worker")[0])
+        order.refresh_from_db()
+        self.assertTrue(order.billing_status)
+        self.assertEqual(mail.outbox[0].to, ["buyer@example.com"])
+        self.assertIn("Total paid: £20.00", mail.outbox[0].body)
+
+    def test_missing_row_is_retried(self):
+        """
+        Test a job whose row cannot be read yet is retried, not marked done
+        """
+        queue.enqueue("orders.tasks.confirm_payment", order_key="missing")
+        self.assertFalse(queue.run(queue.claim(1, "worker")[0]))
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn("DoesNotExist", job.last_error)
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.1 on 2026-10-18 18:04
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_keys(apps, schema_editor):
+    """
+    Orders placed twice before the key was unique share an order_key. Keep
+    the first order under the key, so payment confirmation finds it, and
+    give the later copies a distinct key instead of deleting them.
+    """
+    Order = apps.get_model("orders", "Order")
+    db = schema_editor.connection.alias
+    duplicated = (
+        Order.objects.using(db)
+        .values("order_key")
+        .annotate(orders=Count("id"))
+        .filter(orders__gt=1)
+        .values_list("order_key", flat=True)
+    )
+    for order_key in list(duplicated):
+        ids = (
+            Order.objects.using(db)
+            .filter(order_key=order_key)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        for pk in list(ids)[1:]:
+            suffix = "#duplicate-%s" % pk
+            Order.objects.using(db).filter(id=pk).update(
+                order_key=order_key[: 200 - len(suffix)] + suffix
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='order_key',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+    ]
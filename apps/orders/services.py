@@ -0,0 +1,65 @@
+import logging
+import time
+
+from django.db import transaction
+
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+class OrderPlacement:
+    """
+    The outcome of placing an order, with how long each step took.
+    """
+
+    def __init__(self, order, created, timings):
+        self.order = order
+        self.created = created
+        self.timings = timings
+
+    @property
+    def duration(self):
+        return sum(self.timings.values())
+
+
+def place_order(basket, user_id, order_key, **fields):
+    """
+    Create an order and all of its items from the basket in one transaction.
+
+    Placing the same order_key twice returns the existing order instead of
+    creating a duplicate, whichever request wins the race.
+    """
+    timings = {}
+    started = time.perf_counter()
+    lines = list(basket)
+    timings["basket"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        order, created = Order.objects.get_or_create(
+            order_key=order_key,
+            defaults=dict(
+                user_id=user_id, total_paid=basket.get_total_price(), **fields
+            ),
+        )
+        if created:
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order,
+                    product=line["product"],
+                    price=line["price"],
+                    quantity=line["qty"],
+                )
+                for line in lines
+            )
+    timings["transaction"] = time.perf_counter() - started
+
+    placement = OrderPlacement(order, created, timings)
+    logger.info(
+        "order %s %s in %.1fms",
+        order_key,
+        "placed" if created else "already exists",
+        placement.duration * 1000,
+    )
+    return placement
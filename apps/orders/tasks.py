@@ -0,0 +1,20 @@
+from django.template.loader import render_to_string
+
+from jobs.queue import job
+
+from .models import Order
+
+
+@job()
+def confirm_payment(order_key):
+    """
+    Mark an order as paid and send the customer its confirmation.
+    """
+    order = Order.objects.select_related("user").get(order_key=order_key)
+    if not order.billing_status:
+        Order.objects.filter(pk=order.pk).update(billing_status=True)
+    message = render_to_string(
+        "orders/order_confirmation_email.html",
+        {"order": order, "items": order.items.select_related("product")},
+    )
+    order.user.email_user(subject="Your order confirmation", message=message)
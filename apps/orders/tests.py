@@ -1,3 +1,113 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from basket.basket import Basket
+from orders.models import Order, OrderItem
+from orders.services import place_order
+from store.models import Category, Product, ProductType
+
+
+class TestOrderPlacement(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        for i in range(3):
+            product = Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            self.client.post(
+                reverse("basket:basket_add"),
+                {"productid": product.id, "productqty": 2, "action": "post"},
+            )
+        self.client.force_login(self.user)
+
+    def place(self, order_key):
+        return self.client.post(
+            reverse("orders:add"), {"order_key": order_key, "action": "post"}
+        )
+
+    def test_order_placed_with_items(self):
+        """
+        Test the order and every basket line are created together
+        """
+        response = self.place("key-1")
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(order_key="key-1")
+        self.assertEqual(order.total_paid, Decimal("120.00"))
+        self.assertEqual(order.items.count(), 3)
+
+    def test_order_placement_is_idempotent(self):
+        """
+        Test placing the same order key twice keeps a single order
+        """
+        self.place("key-1")
+        self.place("key-1")
+        self.assertEqual(Order.objects.filter(order_key="key-1").count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 3)
+
+    def test_placement_reports_timings(self):
+        """
+        Test the placement result reports creation and its timings
+        """
+        request = self.client.get(reverse("basket:basket_summary")).wsgi_request
+        first = place_order(Basket(request), user_id=self.user.id, order_key="key-2")
+        second = place_order(Basket(request), user_id=self.user.id, order_key="key-2")
+        self.assertTrue(first.created)
+        self.assertFalse(second.created)
+        self.assertEqual(first.order, second.order)
+        self.assertEqual(set(first.timings), {"basket", "transaction"})
+        self.assertGreater(first.duration, 0)
+
+
+class TestOrderKeyMigration(TransactionTestCase):
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate([("orders", "0001_initial")])
+        self.addCleanup(self.migrate_forward)
+
+    def migrate_forward(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_keys_renamed(self):
+        """
+        Test orders placed twice under one key survive making the key unique
+        """
+        apps = self.executor.loader.project_state(("orders", "0001_initial")).apps
+        user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        Order = apps.get_model("orders", "Order")
+        fields = {
+            "user_id": user.id,
+            "full_name": "Buyer",
+            "address1": "1 High Street",
+            "address2": "",
+            "city": "London",
+            "phone": "0123456789",
+            "postal_code": "AB1 2CD",
+            "total_paid": "20.00",
+        }
+        first, second = (
+            Order.objects.create(order_key="key", **fields) for _ in range(2)
+        )
+        Order.objects.create(order_key="other", **fields)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([("orders", "0002_order_key_unique")])
+        keys = dict(Order.objects.values_list("id", "order_key"))
+        self.assertEqual(keys[first.id], "key")
+        self.assertEqual(keys[second.id], "key#duplicate-%s" % second.id)
@@ -2,47 +2,36 @@ from django.shortcuts import render
 from django.http.response import JsonResponse
 from django.shortcuts import render
 
-from basket.basket import Basket
+from basket.basket import get_basket
+from jobs.queue import enqueue
 
-from .models import Order, OrderItem
+from .models import Order
+from .services import place_order
+from .tasks import confirm_payment
 
 
 def add(request):
-    basket = Basket(request)
+    basket = get_basket(request)
     if request.POST.get("action") == "post":
 
         order_key = request.POST.get("order_key")
         user_id = request.user.id
-        baskettotal = basket.get_total_price()
-
-        # Check if order exists
-        if Order.objects.filter(order_key=order_key).exists():
-            pass
-        else:
-            order = Order.objects.create(
-                user_id=user_id,
-                full_name="name",
-                address1="add1",
-                address2="add2",
-                total_paid=baskettotal,
-                order_key=order_key,
-            )
-            order_id = order.pk
-
-            for item in basket:
-                OrderItem.objects.create(
-                    order_id=order_id,
-                    product=item["product"],
-                    price=item["price"],
-                    quantity=item["qty"],
-                )
+
+        place_order(
+            basket,
+            user_id=user_id,
+            order_key=order_key,
+            full_name="name",
+            address1="add1",
+            address2="add2",
+        )
 
         response = JsonResponse({"success": "Return something"})
         return response
 
 
 def payment_confirmation(data):
-    Order.objects.filter(order_key=data).update(billing_status=True)
+    enqueue(confirm_payment, order_key=data)
 
 
 def user_orders(request):
@@ -1,7 +1,15 @@
+import os
+
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from mptt.admin import MPTTModelAdmin
 
+from .importer import READERS, CatalogImportError, import_catalog, open_text
+
 from .models import (
     Category,
     Product,
@@ -38,6 +46,22 @@ class ProductSpecificationValueInline(admin.TabularInline):
     model = ProductSpecificationValue
 
 
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="A CSV or JSON lines (.jsonl) file laid out like the catalog "
+        "export."
+    )
+    product_type = forms.CharField(
+        required=False, help_text="Used for rows that do not name a product type."
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data["file"]
+        if os.path.splitext(upload.name)[1][1:].lower() not in READERS:
+            raise forms.ValidationError("Upload a .csv or .jsonl file.")
+        return upload
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     inlines = [
@@ -46,3 +70,51 @@ class ProductAdmin(admin.ModelAdmin):
     ]
 
     prepopulated_fields = {"slug": ("title",)}
+    change_list_template = "admin/store/product/change_list.html"
+
+    def get_urls(self):
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="store_product_import",
+            ),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """
+        Import an uploaded CSV or JSON lines catalog file.
+        """
+        # Rows matching an existing slug update that product
+        if not (
+            self.has_add_permission(request) and self.has_change_permission(request)
+        ):
+            raise PermissionDenied
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            import_format = os.path.splitext(upload.name)[1][1:].lower()
+            try:
+                result = import_catalog(
+                    open_text(upload.file),
+                    import_format,
+                    default_product_type=form.cleaned_data["product_type"] or None,
+                )
+            except CatalogImportError as e:
+                form.add_error("file", str(e))
+            else:
+                self.message_user(request, "Imported %s." % result, messages.SUCCESS)
+                for line, error in result.errors[:10]:
+                    self.message_user(
+                        request, "Line %s: %s" % (line, error), messages.WARNING
+                    )
+                return redirect("admin:store_product_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "title": "Import products",
+        }
+        return TemplateResponse(request, "admin/store/product/import.html", context)
+
@@ -0,0 +1,210 @@
+from bisect import bisect_left, bisect_right
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.urls import reverse
+
+from core.helpers import bump_version, get_version, invalidate_on_commit
+
+from .models import Category
+
+CATEGORY_NAMESPACE = "store:categories"
+
+
+class CategoryNode:
+    """
+    A read only snapshot of a single Category row.
+    """
+
+    fields = (
+        "id",
+        "name",
+        "slug",
+        "parent_id",
+        "is_active",
+        "lft",
+        "rght",
+        "tree_id",
+        "level",
+    )
+
+    def __init__(
+        self, id, name, slug, parent_id, is_active, lft, rght, tree_id, level
+    ):
+        self.id = self.pk = id
+        self.name = name
+        self.slug = slug
+        self.parent_id = parent_id
+        self.is_active = is_active
+        self.lft = lft
+        self.rght = rght
+        self.tree_id = tree_id
+        self.level = level
+
+    def is_root_node(self):
+        return self.parent_id is None
+
+    def get_absolute_url(self):
+        return reverse("store:category_list", args=[self.slug])
+
+    def __str__(self):
+        return self.name
+
+
+class CategoryIndex:
+    """
+    The whole category tree held in memory.
+
+    Resolves slugs to nodes and nodes to their MPTT (tree_id, lft, rght)
+    range so store views can filter products without touching the
+    category table.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = sorted(nodes, key=lambda node: (node.tree_id, node.lft))
+        self.by_id = {node.id: node for node in self.nodes}
+        self.by_slug = {node.slug: node for node in self.nodes}
+        self._positions = [(node.tree_id, node.lft) for node in self.nodes]
+        self._children = {}
+        for node in self.nodes:
+            self._children.setdefault(node.parent_id, []).append(node)
+        self._descendants = {}
+
+    @classmethod
+    def build(cls):
+        rows = Category.objects.values_list(*CategoryNode.fields)
+        return cls([CategoryNode(*row) for row in rows])
+
+    def get(self, slug):
+        return self.by_slug.get(slug)
+
+    def get_by_id(self, pk):
+        return self.by_id.get(pk)
+
+    def roots(self):
+        return self._children.get(None, [])
+
+    def children(self, node):
+        return self._children.get(node.id, [])
+
+    def descendants(self, node, include_self=True):
+        """
+        Return node's subtree in tree order; nodes sharing a tree are sorted
+        by lft so the subtree is one contiguous slice.
+        """
+        start = bisect_left(self._positions, (node.tree_id, node.lft))
+        end = bisect_right(self._positions, (node.tree_id, node.rght))
+        subtree = self.nodes[start:end]
+        return subtree if include_self else subtree[1:]
+
+    def descendant_ids(self, node, include_self=True):
+        """
+        Return the ids of every category below node, memoized per node.
+        """
+        if node.id not in self._descendants:
+            self._descendants[node.id] = frozenset(
+                other.id for other in self.descendants(node)
+            )
+        ids = self._descendants[node.id]
+        return ids if include_self else ids - {node.id}
+
+    def product_filter(self, node, prefix="category"):
+        """
+        Return a Q matching products that belong to node or any node below it.
+        """
+        return Q(
+            **{
+                "%s__tree_id" % prefix: node.tree_id,
+                "%s__lft__gte" % prefix: node.lft,
+                "%s__lft__lte" % prefix: node.rght,
+            }
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_descendants"] = {}
+        return state
+
+
+class NavigationNode:
+    """
+    A category as shown in the site navigation, with its active children.
+    """
+
+    def __init__(self, node, children):
+        self.id = node.id
+        self.name = node.name
+        self.slug = node.slug
+        self.url = node.get_absolute_url()
+        self.is_active = node.is_active
+        self.children = children
+
+    def get_absolute_url(self):
+        return self.url
+
+    def __str__(self):
+        return self.name
+
+
+def build_navigation(index):
+    """
+    Materialize the active part of the category tree, roots first.
+    """
+
+    def walk(nodes):
+        return [
+            NavigationNode(node, walk(index.children(node)))
+            for node in nodes
+            if node.is_active
+        ]
+
+    return walk(index.roots())
+
+
+_local = {"version": None, "index": None, "navigation": None}
+
+
+def get_category_index():
+    """
+    Return the category index for the current version, building it at most
+    once per version across all processes sharing the cache.
+    """
+    version = get_version(CATEGORY_NAMESPACE)
+    if _local["version"] == version:
+        return _local["index"]
+
+    key = "%s:index:%s" % (CATEGORY_NAMESPACE, version)
+    index = cache.get(key)
+    if index is None:
+        index = CategoryIndex.build()
+        cache.set(key, index, timeout=None)
+
+    _local["version"], _local["index"], _local["navigation"] = version, index, None
+    return index
+
+
+def get_navigation():
+    """
+    Return the navigation tree for the current category version.
+    """
+    index = get_category_index()
+    if _local["navigation"] is not None:
+        return _local["navigation"]
+
+    key = "%s:navigation:%s" % (CATEGORY_NAMESPACE, _local["version"])
+    navigation = cache.get(key)
+    if navigation is None:
+        navigation = build_navigation(index)
+        cache.set(key, navigation, timeout=None)
+
+    _local["navigation"] = navigation
+    return navigation
+
+
+def _bump_category_index():
+    bump_version(CATEGORY_NAMESPACE)
+    _local["version"] = _local["index"] = _local["navigation"] = None
+
+
+def invalidate_category_index():
+    invalidate_on_commit(_bump_category_index)
@@ -1,5 +1,11 @@
-from store.models import Category
+from django.utils.functional import SimpleLazyObject
+
+from store.category_index import get_navigation
 
 
 def categories(request):
-    return {"categories": Category.objects.filter(level=0)}
+    """
+    Expose the navigation tree lazily; pages that never render the menu
+    never resolve it.
+    """
+    return {"categories": SimpleLazyObject(get_navigation)}
@@ -0,0 +1,177 @@
+import csv
+import json
+from urllib.parse import urljoin
+from xml.sax.saxutils import escape
+
+from .category_index import get_category_index
+from .models import Product, ProductSpecificationValue
+
+CURRENCY = "GBP"
+
+MERCHANT_NAMESPACE = "http://base.google.com/ns/1.0"
+
+CSV_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "link",
+    "image_link",
+    "category",
+    "regular_price",
+    "discount_price",
+    "availability",
+    "specifications",
+)
+
+
+def category_path(index, category_id, paths):
+    """
+    Return "Root > Child > Leaf" for a category, memoized in paths.
+    """
+    if category_id not in paths:
+        names = []
+        node = index.get_by_id(category_id)
+        while node is not None:
+            names.append(node.name)
+            node = index.get_by_id(node.parent_id)
+        paths[category_id] = " > ".join(reversed(names))
+    return paths[category_id]
+
+
+def iter_products(base_url="", chunk_size=1000, include_inactive=False):
+    """
+    Yield every product as a flat dict ready for export.
+
+    Products are read in id order one chunk at a time, with one query for
+    the chunk and one for its specifications, so memory stays bounded by
+    chunk_size however large the catalog is.
+    """
+    index = get_category_index()
+    paths = {}
+    queryset = Product.objects.with_feature_image().order_by("id")
+    if not include_inactive:
+        queryset = queryset.filter(is_active=True)
+
+    last_id = 0
+    while True:
+        products = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not products:
+            break
+        last_id = products[-1].id
+
+        specifications = {}
+        values = (
+            ProductSpecificationValue.objects.filter(
+                product_id__in=[product.id for product in products]
+            )
+            .order_by("id")
+            .values_list("product_id", "specification__name", "value")
+        )
+        for product_id, name, value in values:
+            specifications.setdefault(product_id, {})[name] = value
+
+        for product in products:
+            image = product.feature_image
+            yield {
+                "id": product.id,
+                "title": product.title,
+                "description": product.description,
+                "link": urljoin(base_url, product.get_absolute_url()),
+                "image_link": urljoin(base_url, image.large_url) if image else "",
+                "category": category_path(index, product.category_id, paths),
+                "regular_price": str(product.regular_price),
+                "discount_price": str(product.discount_price),
+                "availability": "in_stock" if product.is_active else "out_of_stock",
+                "specifications": specifications.get(product.id, {}),
+            }
+
+
+class Echo:
+    """
+    A file-like object that hands back what is written, so csv.writer can
+    format one row at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_csv(records):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for record in records:
+        record["specifications"] = "; ".join(
+            "%s: %s" % item for item in record["specifications"].items()
+        )
+        yield writer.writerow([record[field] for field in CSV_FIELDS])
+
+
+def export_jsonl(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def element(tag, value):
+    return "<%s>%s</%s>" % (tag, escape(str(value)), tag)
+
+
+def merchant_item(record):
+    lines = [
+        element("g:id", record["id"]),
+        element("title", record["title"]),
+        element("description", record["description"]),
+        element("link", record["link"]),
+        element("g:product_type", record["category"]),
+        element("g:condition", "new"),
+        element("g:availability", record["availability"]),
+        element("g:price", "%s %s" % (record["regular_price"], CURRENCY)),
+    ]
+    if record["image_link"]:
+        lines.append(element("g:image_link", record["image_link"]))
+    if record["discount_price"] != record["regular_price"]:
+        lines.append(
+            element("g:sale_price", "%s %s" % (record["discount_price"], CURRENCY))
+        )
+    for name, value in record["specifications"].items():
+        lines.append(
+            "<g:product_detail>%s%s</g:product_detail>"
+            % (element("g:attribute_name", name), element("g:attribute_value", value))
+        )
+    return "<item>\n%s\n</item>\n" % "\n".join(lines)
+
+
+def export_merchant_xml(records, title="Catalog", link=""):
+    """
+    Yield a Google Merchant Center style RSS 2.0 product feed.
+    """
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:g="%s">\n<channel>\n%s\n%s\n%s\n'
+        % (
+            MERCHANT_NAMESPACE,
+            element("title", title),
+            element("link", link),
+            element("description", title),
+        )
+    )
+    for record in records:
+        yield merchant_item(record)
+    yield "</channel>\n</rss>\n"
+
+
+# Format name -> (writer, content type, file extension)
+FORMATS = {
+    "csv": (export_csv, "text/csv; charset=utf-8", "csv"),
+    "jsonl": (export_jsonl, "application/x-ndjson; charset=utf-8", "jsonl"),
+    "xml": (export_merchant_xml, "application/xml; charset=utf-8", "xml"),
+}
+
+
+def export_catalog(export_format, base_url="", **options):
+    """
+    Return an iterator of text chunks with the catalog in export_format.
+    """
+    records = iter_products(base_url, **options)
+    if export_format == "xml":
+        return export_merchant_xml(records, link=base_url)
+    return FORMATS[export_format][0](records)
@@ -0,0 +1,264 @@
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.helpers import bump_version, get_version, invalidate_on_commit
+
+from .models import Product, ProductSpecification, ProductSpecificationValue
+
+FACET_NAMESPACE = "store:facets"
+
+# Query string parameter carrying the selected facets as "<spec id>:<value>"
+FACET_PARAM = "f"
+
+
+class FacetValue:
+    def __init__(self, value, count, selected, query):
+        self.value = value
+        self.count = count
+        self.selected = selected
+        self.query = query
+
+
+class Facet:
+    def __init__(self, specification_id, name, values):
+        self.specification_id = specification_id
+        self.name = name
+        self.values = values
+
+
+def parse_selection(querydict):
+    """
+    Read the selected facets from the request, as {spec id: {values}}.
+    """
+    selected = {}
+    for item in querydict.getlist(FACET_PARAM):
+        specification_id, sep, value = item.partition(":")
+        if sep and specification_id.isdigit() and value:
+            selected.setdefault(int(specification_id), set()).add(value)
+    return selected
+
+
+class FacetIndex:
+    """
+    Inverted index of specification values to the active products having
+    them.
+
+    Values of one specification are OR'ed and specifications are AND'ed, so
+    "author is X or Y, and format is Z" is a couple of set operations rather
+    than a self-join per specification.
+    """
+
+    def __init__(self, specifications, products, values):
+        self.specifications = dict(specifications)
+        self.by_category = {}
+        self.product_category = {}
+        self.postings = {}
+        self.product_values = {}
+        self._scopes = {}
+        for product_id, category_id in products:
+            self._add_product(product_id, category_id)
+        for product_id, specification_id, value in values:
+            self._add_value(product_id, specification_id, value)
+
+    @classmethod
+    def build(cls):
+        return cls(
+            ProductSpecification.objects.values_list("id", "name"),
+            Product.objects.filter(is_active=True).values_list("id", "category_id"),
+            ProductSpecificationValue.objects.filter(
+                product__is_active=True
+            ).values_list("product_id", "specification_id", "value"),
+        )
+
+    def _add_product(self, product_id, category_id):
+        self.product_category[product_id] = category_id
+        self.by_category.setdefault(category_id, set()).add(product_id)
+
+    def _add_value(self, product_id, specification_id, value):
+        if product_id not in self.product_category:
+            return
+        values = self.postings.setdefault(specification_id, {})
+        values.setdefault(value, set()).add(product_id)
+        self.product_values.setdefault(product_id, []).append(
+            (specification_id, value)
+        )
+
+    def _remove_product(self, product_id):
+        category_id = self.product_category.pop(product_id, None)
+        if category_id is not None:
+            self.by_category[category_id].discard(product_id)
+        for specification_id, value in self.product_values.pop(product_id, []):
+            products = self.postings[specification_id][value]
+            products.discard(product_id)
+            if not products:
+                del self.postings[specification_id][value]
+
+    def refresh_products(self, product_ids):
+        """
+        Re-read some products and patch their postings in place.
+        """
+        for product_id in product_ids:
+            self._remove_product(product_id)
+        products = Product.objects.filter(
+            id__in=product_ids, is_active=True
+        ).values_list("id", "category_id")
+        for product_id, category_id in products:
+            self._add_product(product_id, category_id)
+        values = ProductSpecificationValue.objects.filter(
+            product_id__in=self.product_category.keys() & set(product_ids)
+        ).values_list("product_id", "specification_id", "value")
+        for product_id, specification_id, value in values:
+            self._add_value(product_id, specification_id, value)
+        self._scopes.clear()
+
+    def scope(self, category_ids):
+        """
+        Return the products of a category subtree, memoized per subtree.
+        """
+        if category_ids not in self._scopes:
+            products = set()
+            for category_id in category_ids:
+                products |= self.by_category.get(category_id, set())
+            self._scopes[category_ids] = frozenset(products)
+        return self._scopes[category_ids]
+
+    def filter(self, scope, selected):
+        matched = scope
+        for specification_id, values in selected.items():
+            postings = self.postings.get(specification_id, {})
+            allowed = set()
+            for value in values:
+                allowed |= postings.get(value, set())
+            matched = matched & allowed
+        return matched
+
+    def _count(self, products, counts, specification_ids=None):
+        for product_id in products:
+            for specification_id, value in self.product_values.get(product_id, ()):
+                if specification_ids is not None:
+                    if specification_id not in specification_ids:
+                        continue
+                values = counts.setdefault(specification_id, {})
+                values[value] = values.get(value, 0) + 1
+
+    def facets(self, scope, selected, querydict=None):
+        """
+        Return (matching product ids, facets for the sidebar).
+
+        A value's count is the number of products the listing would show if
+        that value were added to the current selection.
+        """
+        matched = self.filter(scope, selected)
+        counts = {}
+        self._count(
+            matched,
+            counts,
+            None if not selected else set(self.specifications) - set(selected),
+        )
+        for specification_id in selected:
+            others = {k: v for k, v in selected.items() if k != specification_id}
+            self._count(self.filter(scope, others), counts, {specification_id})
+
+        facets = []
+        for specification_id, values in sorted(
+            counts.items(), key=lambda item: self.specifications.get(item[0], "")
+        ):
+            chosen = selected.get(specification_id, set())
+            facets.append(
+                Facet(
+                    specification_id,
+                    self.specifications.get(specification_id, ""),
+                    [
+                        FacetValue(
+                            value,
+                            count,
+                            value in chosen,
+                            toggle_query(querydict, specification_id, value),
+                        )
+                        for value, count in sorted(values.items())
+                    ],
+                )
+            )
+        return matched, facets
+
+
+def toggle_query(querydict, specification_id, value):
+    """
+    Return the query string selecting or unselecting one facet value.
+    """
+    if querydict is None:
+        return ""
+    item = "%s:%s" % (specification_id, value)
+    items = querydict.getlist(FACET_PARAM)
+    if item in items:
+        items = [other for other in items if other != item]
+    else:
+        items = items + [item]
+    return urlencode([(FACET_PARAM, other) for other in items])
+
+
+# Changes replayed onto a process's copy before it rebuilds instead
+FACET_MAX_REPLAY = 200
+FACET_CHANGE_SECONDS = 60 * 60
+
+_local = {"version": None, "index": None}
+
+
+def facet_change_key(version):
+    return "%s:change:%s" % (FACET_NAMESPACE, version)
+
+
+def get_facet_index():
+    """
+    Return this process's index, replaying the products changed since it
+    was built. The index itself is never cached, as it grows with the
+    catalog; only the changed product ids are shared between processes.
+    """
+    version = get_version(FACET_NAMESPACE)
+    if _local["version"] == version:
+        return _local["index"]
+
+    index = _local["index"]
+    if index is not None and 0 < version - _local["version"] <= FACET_MAX_REPLAY:
+        keys = [
+            facet_change_key(other)
+            for other in range(_local["version"] + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        # A bump without a recorded product, or an evicted one, rebuilds
+        if len(changes) == len(keys):
+            index.refresh_products(set(changes.values()))
+        else:
+            index = None
+    else:
+        index = None
+    if index is None:
+        index = FacetIndex.build()
+
+    _local["version"], _local["index"] = version, index
+    return index
+
+
+def record_product_change(product_id):
+    version = bump_version(FACET_NAMESPACE)
+    cache.set(facet_change_key(version), product_id, timeout=FACET_CHANGE_SECONDS)
+
+
+def product_changed(product_id):
+    """
+    Record one product change once it commits, so every process patches
+    its copy for that product. Nothing is patched before the commit, so a
+    rollback leaves the index untouched.
+    """
+    transaction.on_commit(lambda: record_product_change(product_id))
+
+
+def _bump_facet_index():
+    bump_version(FACET_NAMESPACE)
+    _local["version"] = _local["index"] = None
+
+
+def invalidate_facet_index():
+    invalidate_on_commit(_bump_facet_index)
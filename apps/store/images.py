@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Product cards are drawn at 200x300; "large" covers 2x screens and the
+# product page.
+THUMBNAIL_SIZES = {
+    "small": (200, 300),
+    "large": (400, 600),
+}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# How long an image found without derivatives is served as the original
+# before storage is checked again
+MISSING_DERIVATIVES_SECONDS = 60
+
+
+def fallback_extension(name):
+    """
+    Derivatives keep PNG for PNG originals (transparency), JPEG otherwise.
+    """
+    return "png" if name.lower().endswith(".png") else "jpg"
+
+
+def derivative_name(name, size, extension=None):
+    """
+    Return the storage name of a derivative, next to the original:
+    images/cover.jpg -> images/cover_200x300.webp
+    """
+    width, height = THUMBNAIL_SIZES[size]
+    root, ext = os.path.splitext(name)
+    extension = extension or fallback_extension(name)
+    return "%s_%sx%s.%s" % (root, width, height, extension)
+
+
+def derivative_names(name):
+    return [
+        derivative_name(name, size, extension)
+        for size in THUMBNAIL_SIZES
+        for extension in (fallback_extension(name), "webp")
+    ]
+
+
+def derivatives_key(name):
+    return "store:derivatives:%s" % hashlib.md5(name.encode()).hexdigest()
+
+
+def has_derivatives(name, storage=default_storage):
+    """
+    Return whether every derivative of an original exists, remembered in
+    the cache so pages do not stat storage for each image they show.
+    """
+    key = derivatives_key(name)
+    ready = cache.get(key)
+    if ready is None:
+        ready = all(storage.exists(target) for target in derivative_names(name))
+        cache.set(key, ready, None if ready else MISSING_DERIVATIVES_SECONDS)
+    return ready
+
+
+def _encode(image, extension):
+    buffer = BytesIO()
+    if extension == "webp":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    elif extension == "png":
+        image.save(buffer, "PNG", optimize=True)
+    else:
+        image.convert("RGB").save(
+            buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True
+        )
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, force=False, storage=default_storage):
+    """
+    Write every thumbnail size of an original in its fallback format and in
+    WebP. Existing derivatives are kept unless force is set.
+
+    Returns the names written; a missing or unreadable original is logged
+    and skipped.
+    """
+    pending = [
+        (size, extension)
+        for size in THUMBNAIL_SIZES
+        for extension in (fallback_extension(name), "webp")
+        if force or not storage.exists(derivative_name(name, size, extension))
+    ]
+    if not pending:
+        cache.set(derivatives_key(name), True, None)
+        return []
+
+    try:
+        with storage.open(name, "rb") as original:
+            source = Image.open(original)
+            source.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as e:
+        logger.warning("cannot build thumbnails for %s: %s", name, e)
+        return []
+
+    source = ImageOps.exif_transpose(source)
+    if source.mode not in ("RGB", "RGBA"):
+        source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+    written = []
+    resized = {}
+    for size, extension in pending:
+        if size not in resized:
+            resized[size] = ImageOps.fit(source, THUMBNAIL_SIZES[size], Image.LANCZOS)
+        target = derivative_name(name, size, extension)
+        if storage.exists(target):
+            storage.delete(target)
+        written.append(
+            storage.save(target, ContentFile(_encode(resized[size], extension)))
+        )
+    cache.set(derivatives_key(name), True, None)
+    return written
+
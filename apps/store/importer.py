@@ -0,0 +1,414 @@
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .category_index import get_category_index
+from .facets import invalidate_facet_index
+from .models import (
+    Product,
+    ProductSpecification,
+    ProductSpecificationValue,
+    ProductType,
+)
+from .page_cache import invalidate_catalog_pages
+from .search import insert_rows, remove_products
+
+CENT = Decimal("0.01")
+
+MAX_PRICE = Decimal("999.99")
+
+# Product columns written by an import, in statement order
+PRODUCT_FIELDS = (
+    "product_type",
+    "category",
+    "title",
+    "description",
+    "slug",
+    "regular_price",
+    "discount_price",
+    "is_active",
+)
+TITLE, DESCRIPTION, SLUG, IS_ACTIVE = (
+    PRODUCT_FIELDS.index(name) for name in ("title", "description", "slug", "is_active")
+)
+
+
+def column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+# Rows are written with executemany; building model instances and letting
+# bulk_create compile the SQL costs more than the inserts themselves.
+INSERT_PRODUCT = "INSERT INTO %s (%s) VALUES (%s)" % (
+    table(Product),
+    ", ".join(
+        column(Product, name) for name in PRODUCT_FIELDS + ("created_at", "updated_at")
+    ),
+    ", ".join(["%s"] * (len(PRODUCT_FIELDS) + 2)),
+)
+UPDATE_PRODUCT = "UPDATE %s SET %s WHERE %s = %%s" % (
+    table(Product),
+    ", ".join(
+        "%s = %%s" % column(Product, name) for name in PRODUCT_FIELDS + ("updated_at",)
+    ),
+    column(Product, "id"),
+)
+INSERT_VALUE = "INSERT INTO %s (%s, %s, %s) VALUES (%%s, %%s, %%s)" % (
+    table(ProductSpecificationValue),
+    column(ProductSpecificationValue, "product"),
+    column(ProductSpecificationValue, "specification"),
+    column(ProductSpecificationValue, "value"),
+)
+DELETE_VALUES = "DELETE FROM %s WHERE %s IN (%%s)" % (
+    table(ProductSpecificationValue),
+    column(ProductSpecificationValue, "product"),
+)
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+def is_utf8(text):
+    # Streams are opened with surrogateescape, which keeps undecodable bytes
+    # as lone surrogates instead of failing the whole file
+    try:
+        text.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def read_csv(stream):
+    """
+    Yield rows from a CSV file laid out like the CSV export. Specifications
+    are "name: value" pairs separated by semicolons.
+
+    Like read_jsonl(), a row that cannot be parsed is yielded as a
+    CatalogImportError, to be recorded against its line.
+    """
+    reader = csv.DictReader(stream)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield CatalogImportError("invalid CSV: %s" % e)
+            continue
+        if not is_utf8("".join(v for v in row.values() if isinstance(v, str))):
+            yield CatalogImportError("not valid UTF-8")
+            continue
+        specifications = {}
+        for pair in (row.get("specifications") or "").split(";"):
+            name, sep, value = pair.partition(":")
+            if sep and name.strip():
+                specifications[name.strip()] = value.strip()
+        row["specifications"] = specifications
+        yield row
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if not line.strip():
+            continue
+        if not is_utf8(line):
+            yield CatalogImportError("not valid UTF-8")
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield CatalogImportError("invalid JSON: %s" % e)
+            continue
+        if not isinstance(row, dict):
+            yield CatalogImportError("expected a JSON object")
+            continue
+        yield row
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def open_text(upload):
+    """
+    Wrap a binary upload or file as text for the readers.
+    """
+    return io.TextIOWrapper(
+        upload, encoding="utf-8-sig", errors="surrogateescape", newline=""
+    )
+
+
+def parse_price(value):
+    try:
+        price = Decimal(str(value).strip()).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        raise CatalogImportError("invalid price %r" % value)
+    if not 0 <= price <= MAX_PRICE:
+        raise CatalogImportError("price %s is out of range" % price)
+    return price
+
+
+def parse_active(row):
+    if "is_active" in row:
+        value = row["is_active"]
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes")
+        return bool(value)
+    return row.get("availability", "in_stock") != "out_of_stock"
+
+
+def row_slug(row):
+    """
+    Return the slug given by the row, or the one at the end of its link.
+    """
+    slug = row.get("slug") or ""
+    if not slug and row.get("link"):
+        slug = row["link"].rstrip("/").rsplit("/", 1)[-1]
+    return slugify(slug)[:255] if slug else ""
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.start = time.perf_counter()
+
+    @property
+    def rows(self):
+        return self.created + self.updated + len(self.errors)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed
+        return int((self.created + self.updated) / elapsed) if elapsed else 0
+
+    def __str__(self):
+        return "%s created, %s updated, %s errors in %.1fs (%s products/s)" % (
+            self.created,
+            self.updated,
+            len(self.errors),
+            self.elapsed,
+            self.rate,
+        )
+
+
+class CatalogImporter:
+    """
+    Load products and their specification values from export-style rows.
+
+    Categories, product types, specifications and existing slugs are held
+    in lookup maps, so resolving a row never touches the database. Rows
+    are written a chunk at a time, each chunk as a few executemany
+    statements inside one transaction.
+
+    A row whose slug, given or taken from its link, matches a product
+    updates that product. Other rows create a product, with its slug made
+    unique by a numeric suffix. Bulk writes skip the model signals, so
+    the search index, facets and page cache are refreshed per chunk and
+    once at the end.
+    """
+
+    def __init__(self, chunk_size=2000, default_product_type=None, progress=None):
+        self.chunk_size = chunk_size
+        self.default_product_type = default_product_type
+        self.progress = progress
+        self.result = ImportResult()
+
+        index = get_category_index()
+        self.categories = {}
+        for node in index.nodes:
+            self.categories[node.slug] = node.id
+            self.categories[node.name.lower()] = node.id
+        self.product_types = {
+            name.lower(): pk
+            for pk, name in ProductType.objects.values_list("id", "name")
+        }
+        self.specifications = {
+            (product_type_id, name.lower()): pk
+            for pk, product_type_id, name in ProductSpecification.objects.values_list(
+                "id", "product_type_id", "name"
+            )
+        }
+        self.slugs = dict(Product.objects.order_by().values_list("slug", "id"))
+
+    def resolve_category(self, value):
+        value = (value or "").split(">")[-1].strip()
+        category_id = self.categories.get(value.lower()) or self.categories.get(value)
+        if category_id is None:
+            raise CatalogImportError("unknown category %r" % value)
+        return category_id
+
+    def resolve_product_type(self, value):
+        name = (value or self.default_product_type or "").strip()
+        if not name:
+            raise CatalogImportError("missing product type")
+        if name.lower() not in self.product_types:
+            product_type, created = ProductType.objects.get_or_create(name=name)
+            self.product_types[name.lower()] = product_type.id
+        return self.product_types[name.lower()]
+
+    def resolve_specification(self, product_type_id, name):
+        key = (product_type_id, name.lower())
+        if key not in self.specifications:
+            specification, created = ProductSpecification.objects.get_or_create(
+                product_type_id=product_type_id, name=name
+            )
+            self.specifications[key] = specification.id
+        return self.specifications[key]
+
+    def unique_slug(self, title, taken):
+        base = slugify(title)[:240] or "product"
+        slug, suffix = base, 1
+        while slug in self.slugs or slug in taken:
+            suffix += 1
+            slug = "%s-%s" % (base, suffix)
+        return slug
+
+    def build(self, row, taken):
+        """
+        Resolve one row into (id or None, slug, column values, specification
+        values), with the values ready for the product statements.
+        """
+        if isinstance(row, CatalogImportError):
+            raise row
+        title = (row.get("title") or "").strip()
+        if not title:
+            raise CatalogImportError("missing title")
+        regular_price = parse_price(row.get("regular_price"))
+        discount_price = parse_price(row.get("discount_price") or regular_price)
+        product_type_id = self.resolve_product_type(row.get("product_type"))
+        category_id = self.resolve_category(row.get("category"))
+
+        slug = row_slug(row)
+        pk = self.slugs.get(slug)
+        if pk is None and (not slug or slug in taken):
+            slug = self.unique_slug(title, taken)
+        elif pk is not None and slug in taken:
+            raise CatalogImportError("slug %r appears twice in one chunk" % slug)
+        taken.add(slug)
+
+        columns = (
+            product_type_id,
+            category_id,
+            title[:255],
+            row.get("description") or "",
+            slug,
+            regular_price,
+            discount_price,
+            parse_active(row),
+        )
+        values = [
+            (self.resolve_specification(product_type_id, name), str(value)[:255])
+            for name, value in (row.get("specifications") or {}).items()
+            if str(value).strip()
+        ]
+        return pk, slug, columns, values
+
+    def run(self, rows):
+        chunk = []
+        for line, row in enumerate(rows, start=1):
+            chunk.append((line, row))
+            if len(chunk) == self.chunk_size:
+                self.write(chunk)
+                chunk = []
+        if chunk:
+            self.write(chunk)
+
+        invalidate_facet_index()
+        invalidate_catalog_pages()
+        return self.result
+
+    def write(self, chunk):
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        taken = set()
+        new, existing, products = [], [], {}
+        for line, row in chunk:
+            try:
+                pk, slug, columns, product_values = self.build(row, taken)
+            except (ValueError, TypeError) as e:
+                self.result.errors.append((line, str(e)))
+                continue
+            if pk is None:
+                new.append(columns + (now, now))
+            else:
+                existing.append(columns + (now, pk))
+            products[slug] = (columns, product_values)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            last_id = Product.objects.aggregate(last=Max("id"))["last"] or 0
+            if new:
+                cursor.executemany(INSERT_PRODUCT, new)
+            if existing:
+                cursor.executemany(UPDATE_PRODUCT, existing)
+            # Read the new ids back; rows other writers added meanwhile are
+            # told apart by slug
+            new_slugs = {columns[SLUG] for columns in new}
+            self.slugs.update(
+                (slug, pk)
+                for slug, pk in Product.objects.filter(id__gt=last_id)
+                .order_by()
+                .values_list("slug", "id")
+                if slug in new_slugs
+            )
+
+            # The values are replaced wholesale; a raw DELETE skips the
+            # per-row delete signals, whose reindexing is done below
+            updated_ids = [columns[-1] for columns in existing]
+            for start in range(0, len(updated_ids), 500):
+                batch = updated_ids[start : start + 500]
+                cursor.execute(
+                    DELETE_VALUES % ", ".join(["%s"] * len(batch)), batch
+                )
+            cursor.executemany(
+                INSERT_VALUE,
+                [
+                    (self.slugs[slug], specification_id, value)
+                    for slug, (columns, product_values) in products.items()
+                    for specification_id, value in product_values
+                ],
+            )
+
+            # Index straight from the rows instead of reading them back
+            remove_products(updated_ids)
+            insert_rows(
+                [
+                    (
+                        self.slugs[slug],
+                        columns[TITLE],
+                        columns[DESCRIPTION],
+                        " ".join(value for _, value in product_values),
+                    )
+                    for slug, (columns, product_values) in products.items()
+                    if columns[IS_ACTIVE]
+                ]
+            )
+
+        self.result.created += len(new)
+        self.result.updated += len(existing)
+        if self.progress is not None:
+            self.progress(self.result)
+
+
+def import_catalog(stream, import_format, **options):
+    """
+    Import a text stream of CSV or JSON lines rows and return the result.
+    """
+    if import_format not in READERS:
+        raise CatalogImportError("unknown format %r" % import_format)
+    return CatalogImporter(**options).run(READERS[import_format](stream))
@@ -0,0 +1,80 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.category_tree import bulk_create_categories
+from store.models import Category
+
+
+def synthetic_tree(nodes, trees, breadth):
+    """
+    Return category rows for a forest of the given size, breadth first.
+    """
+    run_id = uuid.uuid4().hex[:6]
+    rows = [
+        {"name": "Bench %s %s" % (run_id, i), "slug": "bench-%s-%s" % (run_id, i)}
+        for i in range(min(trees, nodes))
+    ]
+    parent = 0
+    while len(rows) < nodes:
+        for child in range(breadth):
+            if len(rows) == nodes:
+                break
+            rows.append(
+                {
+                    "name": "%s.%s" % (rows[parent]["name"], child),
+                    "slug": "%s-%s" % (rows[parent]["slug"], child),
+                    "parent": rows[parent]["slug"],
+                }
+            )
+        parent += 1
+    return rows
+
+
+def create_per_row(rows):
+    categories = {}
+    for row in rows:
+        categories[row["slug"]] = Category.objects.create(
+            name=row["name"],
+            slug=row["slug"],
+            parent=categories.get(row.get("parent")),
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare inserting categories one at a time with the bulk loader. "
+        "Both run in transactions that are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=50000)
+        parser.add_argument("--trees", type=int, default=4)
+        parser.add_argument("--breadth", type=int, default=8)
+        parser.add_argument(
+            "--per-row-limit",
+            type=int,
+            default=2000,
+            help="Nodes inserted one at a time; the cost grows with the square "
+            "of the tree size.",
+        )
+
+    def handle(self, *args, **options):
+        rows = synthetic_tree(options["nodes"], options["trees"], options["breadth"])
+        self.stdout.write(
+            "%-8s %8s %10s %12s" % ("mode", "nodes", "seconds", "nodes/s")
+        )
+        self.measure("per-row", create_per_row, rows[: options["per_row_limit"]])
+        self.measure("bulk", bulk_create_categories, rows)
+
+    def measure(self, name, load, rows):
+        with transaction.atomic():
+            start = time.perf_counter()
+            load(rows)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        self.stdout.write(
+            "%-8s %8s %10.2f %12.0f" % (name, len(rows), elapsed, len(rows) / elapsed)
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.export import FORMATS, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Write the catalog as CSV, JSON lines or a merchant XML feed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write; stdout by default.")
+        parser.add_argument(
+            "--base-url",
+            default="",
+            help="Site root for product and image links, e.g. https://shop.example.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--include-inactive", action="store_true")
+
+    def handle(self, *args, **options):
+        chunks = export_catalog(
+            options["format"],
+            base_url=options["base_url"],
+            chunk_size=options["chunk_size"],
+            include_inactive=options["include_inactive"],
+        )
+        start = time.perf_counter()
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as f:
+                f.writelines(chunks)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Wrote %s in %.1fs."
+                    % (options["output"], time.perf_counter() - start)
+                )
+            )
+        else:
+            self.stdout.ending = ""
+            for chunk in chunks:
+                self.stdout.write(chunk)
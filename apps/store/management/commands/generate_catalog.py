@@ -0,0 +1,278 @@
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from account.models import Address
+from checkout.models import DeliveryOptions
+from orders.models import Order, OrderItem
+from store.category_index import invalidate_category_index
+from store.category_tree import bulk_create_categories
+from store.facets import invalidate_facet_index
+from store.models import (
+    Product,
+    ProductImage,
+    ProductSpecification,
+    ProductSpecificationValue,
+    ProductType,
+)
+from store.page_cache import invalidate_catalog_pages
+from store.search import rebuild_index
+
+WORDS = (
+    "django python web api async cloud data design guide pattern practical "
+    "modern advanced testing deploy scale cache query model view template "
+    "security rest graph stream queue worker search index tree fast clean "
+    "small large complete handbook cookbook primer recipes internals"
+).split()
+
+CENT = Decimal("0.01")
+
+SPECIFICATIONS = {
+    "author": ["Author %s" % i for i in range(200)],
+    "format": ["paperback", "hardback", "ebook", "audiobook"],
+    "language": ["english", "french", "german", "spanish", "arabic"],
+    "publisher": ["Publisher %s" % i for i in range(40)],
+}
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = "Fill the database with a synthetic catalog, customers and orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100000)
+        parser.add_argument("--trees", type=int, default=4, help="Root categories.")
+        parser.add_argument("--depth", type=int, default=4)
+        parser.add_argument("--breadth", type=int, default=4)
+        parser.add_argument("--images", type=int, default=2, help="Per product.")
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--orders", type=int, default=5000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.run_id = uuid.uuid4().hex[:6]
+
+        self.step("categories", self.create_categories, options)
+        self.step("products", self.create_products, options)
+        self.step("customers", self.create_customers, options)
+        self.step("orders", self.create_orders, options)
+        self.step("indexes", self.refresh_indexes, options)
+
+    def step(self, name, method, options):
+        start = time.perf_counter()
+        count = method(options)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            "%-10s %8s rows in %6.1fs (%s rows/s)"
+            % (name, count, elapsed, int(count / elapsed) if elapsed else count)
+        )
+
+    def create_categories(self, options):
+        """
+        Build every tree level by level and load it with the bulk category
+        loader, which computes the MPTT columns once at the end.
+        """
+        level = [
+            {
+                "name": "Books %s %s" % (self.run_id, tree),
+                "slug": "books-%s-%s" % (self.run_id, tree),
+            }
+            for tree in range(options["trees"])
+        ]
+        rows = list(level)
+        for depth in range(options["depth"] - 1):
+            level = [
+                {
+                    "name": "%s.%s" % (parent["name"], child),
+                    "slug": "%s-%s" % (parent["slug"], child),
+                    "parent": parent["slug"],
+                }
+                for parent in level
+                for child in range(options["breadth"])
+            ]
+            rows += level
+
+        created = bulk_create_categories(rows, batch_size=self.batch_size)
+        self.leaves = [created[row["slug"]] for row in level]
+        return len(created)
+
+    def create_specifications(self):
+        product_type, created = ProductType.objects.get_or_create(name="Book")
+        specifications = {}
+        for name in SPECIFICATIONS:
+            specifications[name], created = ProductSpecification.objects.get_or_create(
+                product_type=product_type, name=name
+            )
+        return product_type, specifications
+
+    def create_products(self, options):
+        product_type, specifications = self.create_specifications()
+        rng = self.random
+        pk = next_id(Product)
+        total = options["products"]
+        self.products = []
+
+        for start in range(0, total, self.batch_size):
+            products, values, images = [], [], []
+            for _ in range(min(self.batch_size, total - start)):
+                title = " ".join(rng.sample(WORDS, rng.randint(2, 5))).title()
+                price = Decimal(rng.randint(500, 6000)).scaleb(-2)
+                products.append(
+                    Product(
+                        id=pk,
+                        product_type=product_type,
+                        category_id=rng.choice(self.leaves),
+                        title=title,
+                        description=" ".join(rng.choices(WORDS, k=40)),
+                        slug="%s-%s" % (title.lower().replace(" ", "-"), pk),
+                        regular_price=price,
+                        discount_price=(price * Decimal("0.8")).quantize(CENT),
+                        is_active=rng.random() > 0.02,
+                    )
+                )
+                for name, choices in SPECIFICATIONS.items():
+                    values.append(
+                        ProductSpecificationValue(
+                            product_id=pk,
+                            specification=specifications[name],
+                            value=rng.choice(choices),
+                        )
+                    )
+                for image in range(options["images"]):
+                    images.append(
+                        ProductImage(
+                            product_id=pk,
+                            alt_text=title,
+                            is_feature=image == 0,
+                        )
+                    )
+                self.products.append((pk, price))
+                pk += 1
+
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+                ProductSpecificationValue.objects.bulk_create(values)
+                ProductImage.objects.bulk_create(images)
+            if options["verbosity"] > 1:
+                self.stdout.write("  %s products" % (start + len(products)))
+
+        return len(self.products)
+
+    def create_customers(self, options):
+        password = make_password("password")
+        customers = [
+            get_user_model()(
+                email="customer-%s-%s@example.com" % (self.run_id, i),
+                name="Customer %s" % i,
+                password=password,
+                is_active=True,
+            )
+            for i in range(options["customers"])
+        ]
+        with transaction.atomic():
+            get_user_model().objects.bulk_create(customers, batch_size=self.batch_size)
+            self.customers = list(
+                get_user_model()
+                .objects.filter(email__startswith="customer-%s-" % self.run_id)
+                .values_list("id", flat=True)
+            )
+            Address.objects.bulk_create(
+                [
+                    Address(
+                        customer_id=customer_id,
+                        full_name="Customer %s" % customer_id,
+                        phone="0123456789",
+                        postcode="AB1 2CD",
+                        address_line="%s High Street" % customer_id,
+                        address_line2="",
+                        town_city="London",
+                        delivery_instructions="",
+                        default=True,
+                    )
+                    for customer_id in self.customers
+                ],
+                batch_size=self.batch_size,
+            )
+        if not DeliveryOptions.objects.exists():
+            DeliveryOptions.objects.bulk_create(
+                [
+                    DeliveryOptions(
+                        delivery_name=name,
+                        delivery_price=price,
+                        delivery_method="HD",
+                        delivery_timeframe=timeframe,
+                        delivery_window="9-5",
+                        order=order,
+                    )
+                    for order, (name, price, timeframe) in enumerate(
+                        [("Standard", "4.50", "3 days"), ("Next day", "11.50", "1 day")]
+                    )
+                ]
+            )
+        return len(self.customers)
+
+    def create_orders(self, options):
+        rng = self.random
+        if not self.customers or not self.products:
+            return 0
+
+        pk = next_id(Order)
+        total = options["orders"]
+        for start in range(0, total, self.batch_size):
+            orders, items = [], []
+            for _ in range(min(self.batch_size, total - start)):
+                lines = [
+                    (rng.choice(self.products), rng.randint(1, 3))
+                    for _ in range(rng.randint(1, 4))
+                ]
+                orders.append(
+                    Order(
+                        id=pk,
+                        user_id=rng.choice(self.customers),
+                        full_name="Customer",
+                        address1="High Street",
+                        address2="",
+                        city="London",
+                        phone="0123456789",
+                        postal_code="AB1 2CD",
+                        total_paid=sum(price * qty for (_, price), qty in lines),
+                        order_key=uuid.uuid4().hex,
+                        billing_status=True,
+                    )
+                )
+                items += [
+                    OrderItem(
+                        order_id=pk, product_id=product_id, price=price, quantity=qty
+                    )
+                    for (product_id, price), qty in lines
+                ]
+                pk += 1
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create(items)
+        return total
+
+    def refresh_indexes(self, options):
+        """
+        Bulk inserts skip the model signals, so bring the denormalized
+        columns and the indexes up to date once at the end.
+        """
+        Product.objects.refresh_feature_images()
+        indexed = rebuild_index()
+        invalidate_category_index()
+        invalidate_facet_index()
+        invalidate_catalog_pages()
+        return indexed
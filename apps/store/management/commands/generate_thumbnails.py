@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from store.images import generate_derivatives
+from store.models import ProductImage
+
+
+def _generate(args):
+    name, force = args
+    return name, generate_derivatives(name, force=force)
+
+
+class Command(BaseCommand):
+    help = "Build missing thumbnail and WebP derivatives for product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1, help="Processes to use."
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Rebuild existing derivatives too."
+        )
+
+    def handle(self, *args, **options):
+        names = (
+            ProductImage.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        jobs = [(name, options["force"]) for name in names.iterator()]
+
+        written = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=django.setup
+        ) as executor:
+            for name, derivatives in executor.map(_generate, jobs, chunksize=16):
+                written += len(derivatives)
+                if options["verbosity"] > 1:
+                    self.stdout.write("%s: %s derivatives" % (name, len(derivatives)))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Processed %s images, wrote %s derivatives." % (len(jobs), written)
+            )
+        )
@@ -0,0 +1,50 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importer import READERS, CatalogImportError, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Import products from a CSV or JSON lines file laid out like the export."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format", choices=sorted(READERS), help="Defaults to the file extension."
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--product-type", help="Product type for rows that do not name one."
+        )
+
+    def handle(self, *args, **options):
+        import_format = options["format"] or os.path.splitext(options["path"])[1][1:]
+        with open(
+            options["path"],
+            encoding="utf-8-sig",
+            errors="surrogateescape",
+            newline="",
+        ) as f:
+            try:
+                result = import_catalog(
+                    f,
+                    import_format,
+                    chunk_size=options["chunk_size"],
+                    default_product_type=options["product_type"],
+                    progress=self.progress if options["verbosity"] else None,
+                )
+            except CatalogImportError as e:
+                raise CommandError(e)
+
+        for line, error in result.errors[:20]:
+            self.stderr.write("line %s: %s" % (line, error))
+        if len(result.errors) > 20:
+            self.stderr.write("... and %s more errors" % (len(result.errors) - 20))
+        self.stdout.write(self.style.SUCCESS("Imported %s." % result))
+
+    def progress(self, result):
+        self.stdout.write(
+            "%8s rows  %6.1fs  %6s products/s"
+            % (result.rows, result.elapsed, result.rate)
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from store.search import rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search_available():
+            self.stderr.write("Full-text search needs the SQLite backend.")
+            return
+        indexed = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Indexed %s products." % indexed))
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts USING fts5("
+        "title, description, specifications, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO store_product_fts (rowid, title, description, specifications) "
+        "SELECT p.id, p.title, p.description, COALESCE(("
+        "SELECT group_concat(v.value, ' ') FROM store_productspecificationvalue v "
+        "WHERE v.product_id = p.id), '') "
+        "FROM store_product p WHERE p.is_active"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS store_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0002_product_keyset_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.1 on 2026-10-18 18:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_feature_images(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    ProductImage = apps.get_model("store", "ProductImage")
+    first_feature = (
+        ProductImage.objects.filter(product=models.OuterRef("pk"), is_feature=True)
+        .order_by("id")
+        .values("id")[:1]
+    )
+    Product.objects.update(feature_image=models.Subquery(first_feature))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='feature_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.productimage', verbose_name='Feature image'),
+        ),
+        migrations.RunPython(set_feature_images, migrations.RunPython.noop),
+    ]
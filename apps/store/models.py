@@ -1,9 +1,14 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from mptt.models import MPTTModel, TreeForeignKey
 from django.conf import settings
 
+from .images import derivative_name, has_derivatives
+
 
 class Category(MPTTModel):
     """
@@ -79,6 +84,51 @@ class ProductSpecification(models.Model):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_feature_image(self):
+        """
+        Load each product's feature image in the same query.
+        """
+        return self.select_related("feature_image")
+
+    def refresh_feature_images(self):
+        """
+        Point feature_image at each product's first image flagged as feature,
+        in a single UPDATE.
+        """
+        first_feature = (
+            ProductImage.objects.filter(
+                product=models.OuterRef("pk"), is_feature=True
+            )
+            .order_by("id")
+            .values("id")[:1]
+        )
+        return self.update(feature_image=models.Subquery(first_feature))
+
+    def with_last_modified(self):
+        """
+        Annotate each product with last_modified, the later of its own and
+        its newest image's updated_at.
+        """
+        newest_image = (
+            ProductImage.objects.filter(product=models.OuterRef("pk"))
+            .order_by("-updated_at")
+            .values("updated_at")[:1]
+        )
+        return self.annotate(
+            last_modified=Greatest(
+                "updated_at", Coalesce(models.Subquery(newest_image), "updated_at")
+            )
+        )
+
+    def touch(self):
+        """
+        Mark the products as modified now, for changes to rows that have no
+        updated_at of their own.
+        """
+        return self.update(updated_at=timezone.now())
+
+
 class Product(models.Model):
     """
     The Product table contining all product items.
@@ -127,9 +177,23 @@ class Product(models.Model):
     )
     updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
     users_wishlist = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="user_wishlist", blank=True)
+    feature_image = models.ForeignKey(
+        "ProductImage",
+        verbose_name=_("Feature image"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
-        ordering = ("-created_at",)
+        ordering = ("-created_at", "-id")
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="product_created_id_idx"),
+        ]
         verbose_name = _("Product")
         verbose_name_plural = _("Products")
 
@@ -190,3 +254,37 @@ class ProductImage(models.Model):
     class Meta:
         verbose_name = _("Product Image")
         verbose_name_plural = _("Product Images")
+
+    @cached_property
+    def has_derivatives(self):
+        return has_derivatives(self.image.name, self.image.storage)
+
+    def derivative_url(self, size, extension=None):
+        # Until the derivatives are built, e.g. before the generate_thumbnails
+        # backfill or after a failed post_save, fall back to the original
+        if not self.has_derivatives:
+            return self.image.url
+        return self.image.storage.url(derivative_name(self.image.name, size, extension))
+
+    @property
+    def thumbnail_url(self):
+        return self.derivative_url("small")
+
+    @property
+    def large_url(self):
+        return self.derivative_url("large")
+
+    @property
+    def large_webp_url(self):
+        return self.derivative_url("large", "webp")
+
+    @property
+    def srcset(self):
+        return "%s 1x, %s 2x" % (self.thumbnail_url, self.large_url)
+
+    @property
+    def webp_srcset(self):
+        return "%s 1x, %s 2x" % (
+            self.derivative_url("small", "webp"),
+            self.derivative_url("large", "webp"),
+        )
@@ -0,0 +1,167 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, QueryDict
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from core.helpers import bump_version, get_version, invalidate_on_commit
+
+from .category_index import CATEGORY_NAMESPACE
+
+CATALOG_NAMESPACE = "store:catalog"
+
+# Bumped whenever the shape of a cached page changes, so entries written by
+# the previous release are never read back
+PAGE_FORMAT = 2
+
+
+def page_cache_key(request):
+    """
+    Key a page on its path, query and the catalog and category versions, so
+    any product or category change retires every cached page at once.
+    """
+    full_path = "%s?%s" % (request.path, request.GET.urlencode())
+    path = hashlib.md5(full_path.encode()).hexdigest()
+    return "store:page:v%s:%s:%s:%s" % (
+        PAGE_FORMAT,
+        get_version(CATALOG_NAMESPACE),
+        get_version(CATEGORY_NAMESPACE),
+        path,
+    )
+
+
+def invalidate_catalog_pages():
+    invalidate_on_commit(lambda: bump_version(CATALOG_NAMESPACE))
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(":".join(map(str, parts)).encode()).hexdigest())
+
+
+class CachedPageMixin:
+    """
+    Serve whole catalog pages to anonymous visitors from the cache.
+
+    Cached pages are rendered with ``page_cached`` set in the context, which
+    makes the templates leave out per-visitor fragments (basket badge, CSRF
+    token). The browser fills those in from ``basket:basket_state``.
+
+    Only the query parameters named in page_cache_params reach a cached
+    page, in a fixed order, so tracking or junk parameters neither change
+    what is rendered nor add cache entries.
+
+    Views that can tell cheaply whether a page changed return its ETag and
+    Last-Modified from get_validators(), without rendering. Anonymous
+    conditional requests that still match are answered 304 Not Modified,
+    and the validators are cached alongside the page so a cache hit needs
+    no query at all.
+    """
+
+    page_cache_params = ()
+
+    def page_cache_timeout(self):
+        return getattr(settings, "STORE_PAGE_CACHE_SECONDS", 0)
+
+    def is_page_cacheable(self, request):
+        return (
+            self.page_cache_timeout() > 0
+            and request.method in ("GET", "HEAD")
+            and not request.user.is_authenticated
+        )
+
+    def page_query(self, request):
+        query = QueryDict(mutable=True)
+        for name in sorted(self.page_cache_params):
+            values = [value for value in request.GET.getlist(name) if value]
+            if values:
+                query.setlist(name, sorted(values))
+        query._mutable = False
+        return query
+
+    def get_validators(self):
+        """
+        Return (etag, last modified datetime or None) for the page, or None
+        when it has no cheap validators.
+        """
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        self.page_cached = self.is_page_cacheable(request)
+        if not self.page_cached:
+            response = super().dispatch(request, *args, **kwargs)
+            # Signed in pages carry the wishlist, basket and CSRF token
+            patch_cache_control(response, private=True)
+            return response
+
+        request.GET = self.page_query(request)
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, validators = cached
+            response = self.not_modified(request, validators)
+            if response is None:
+                response = HttpResponse(content, content_type=content_type)
+            response["X-Page-Cache"] = "hit"
+            return self.add_cache_headers(response, validators)
+
+        validators = self.get_validators()
+        response = self.not_modified(request, validators)
+        if response is not None:
+            return self.add_cache_headers(response, validators)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, "render"):
+            response.add_post_render_callback(
+                lambda response: self.store_page(request, key, response, validators)
+            )
+            response["X-Page-Cache"] = "miss"
+        if response.status_code == 200:
+            self.add_cache_headers(response, validators)
+        return response
+
+    def not_modified(self, request, validators):
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp()),
+        )
+
+    def add_cache_headers(self, response, validators):
+        if validators is not None:
+            etag, last_modified = validators
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_cache_control(
+            response, public=True, max_age=getattr(settings, "STORE_PAGE_MAX_AGE", 0)
+        )
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    def store_page(self, request, key, response, validators):
+        # A page that displayed flash messages belongs to this visitor only
+        messages = getattr(request, "_messages", None)
+        if messages is not None and messages.used:
+            del response["ETag"]
+            del response["Last-Modified"]
+            patch_cache_control(response, private=True)
+            return
+        cache.set(
+            key,
+            (response.content, response["Content-Type"], validators),
+            self.page_cache_timeout(),
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["page_cached"] = self.page_cached
+        return context
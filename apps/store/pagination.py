@@ -0,0 +1,142 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.encoding import force_str
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(created_at, pk, direction="next"):
+    """
+    Pack a (created_at, id) position into an opaque url safe token.
+    """
+    payload = json.dumps(
+        [created_at.isoformat(), pk, "n" if direction == "next" else "p"],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Unpack a token created by encode_cursor into (created_at, id, direction).
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, pk, direction = json.loads(base64.urlsafe_b64decode(padded))
+        return (
+            datetime.fromisoformat(created_at),
+            int(pk),
+            "next" if direction == "n" else "previous",
+        )
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(force_str(token))
+
+
+class KeysetPage:
+    """
+    A single page of a keyset paginated queryset.
+
+    Mirrors the parts of django.core.paginator.Page that the templates use,
+    without ever counting the whole result set.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last.created_at, last.pk, "next")
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first.created_at, first.pk, "previous")
+
+
+class KeysetPaginator:
+    """
+    Paginate a Product queryset on (created_at, id), newest first.
+
+    Each page is a single indexed range scan of per_page + 1 rows, so deep
+    pages cost the same as the first one.
+    """
+
+    ordering = ("-created_at", "-id")
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        if not cursor:
+            rows = list(self.queryset.order_by(*self.ordering)[: self.per_page + 1])
+            return KeysetPage(rows[: self.per_page], len(rows) > self.per_page, False)
+
+        created_at, pk, direction = decode_cursor(cursor)
+
+        if direction == "next":
+            after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            queryset = self.queryset.filter(after).order_by(*self.ordering)
+            rows = list(queryset[: self.per_page + 1])
+            return KeysetPage(rows[: self.per_page], len(rows) > self.per_page, True)
+
+        before = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        queryset = self.queryset.filter(before).order_by("created_at", "id")
+        rows = list(queryset[: self.per_page + 1])
+        page_rows = rows[: self.per_page]
+        page_rows.reverse()
+        return KeysetPage(page_rows, True, len(rows) > self.per_page)
+
+
+class KeysetPaginationMixin:
+    """
+    Swap ListView's offset pagination for keyset pagination.
+
+    The cursor is read from the ``cursor`` query parameter; an invalid token
+    simply falls back to the first page.
+    """
+
+    paginate_by = 20
+    cursor_kwarg = "cursor"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        query.pop(self.cursor_kwarg, None)
+        context["pagination_query"] = query.urlencode()
+        return context
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            page = paginator.page()
+        return (paginator, page, page.object_list, page.has_other_pages())
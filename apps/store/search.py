@@ -0,0 +1,146 @@
+import re
+
+from django.db import connection
+
+from .category_index import get_category_index
+from .models import Product, ProductSpecificationValue
+
+SEARCH_TABLE = "store_product_fts"
+
+# bm25 column weights: title, description, specifications
+SEARCH_WEIGHTS = (10.0, 1.0, 2.0)
+
+
+def search_available(using=connection):
+    return using.vendor == "sqlite"
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 query matching every word as a prefix.
+    """
+    words = re.findall(r"\w+", text.lower())
+    return " ".join('"%s"*' % word for word in words)
+
+
+def remove_products(product_ids):
+    product_ids = list(product_ids)
+    if not product_ids or not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM %s WHERE rowid IN (%s)"
+            % (SEARCH_TABLE, ", ".join(["%s"] * len(product_ids))),
+            product_ids,
+        )
+
+
+def index_products(product_ids):
+    """
+    (Re)index the given products; inactive or missing ones are dropped.
+    """
+    product_ids = list(product_ids)
+    if not product_ids or not search_available():
+        return
+
+    specifications = {}
+    values = ProductSpecificationValue.objects.filter(
+        product_id__in=product_ids
+    ).values_list("product_id", "value")
+    for product_id, value in values:
+        specifications.setdefault(product_id, []).append(value)
+
+    rows = [
+        (pk, title, description, " ".join(specifications.get(pk, [])))
+        for pk, title, description in Product.objects.filter(
+            id__in=product_ids, is_active=True
+        ).values_list("id", "title", "description")
+    ]
+
+    remove_products(product_ids)
+    insert_rows(rows)
+
+
+def insert_rows(rows):
+    """
+    Add (id, title, description, specifications) rows to the search table;
+    the products must not be indexed already.
+    """
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO %s (rowid, title, description, specifications) "
+            "VALUES (%%s, %%s, %%s, %%s)" % SEARCH_TABLE,
+            rows,
+        )
+
+
+def rebuild_index(batch_size=2000):
+    """
+    Rebuild the whole search table, walking products in id order.
+    """
+    if not search_available():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM %s" % SEARCH_TABLE)
+
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Product.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        index_products(ids)
+        indexed += len(ids)
+        last_id = ids[-1]
+    return indexed
+
+
+def search(text, category=None, limit=50):
+    """
+    Return active products matching text, best BM25 rank first.
+
+    category is a node from the category index; when given only products
+    in its subtree are returned.
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    if not search_available():
+        queryset = Product.objects.with_feature_image().filter(
+            is_active=True, title__icontains=text
+        )
+        if category is not None:
+            queryset = queryset.filter(get_category_index().product_filter(category))
+        return list(queryset[:limit])
+
+    sql = [
+        "SELECT p.id FROM %s JOIN store_product p ON p.id = %s.rowid"
+        % (SEARCH_TABLE, SEARCH_TABLE)
+    ]
+    params = [match]
+    if category is not None:
+        sql.append("JOIN store_category c ON c.id = p.category_id")
+    sql.append("WHERE %s MATCH %%s AND p.is_active" % SEARCH_TABLE)
+    if category is not None:
+        sql.append("AND c.tree_id = %s AND c.lft BETWEEN %s AND %s")
+        params += [category.tree_id, category.lft, category.rght]
+    sql.append(
+        "ORDER BY bm25(%s, %s) LIMIT %%s"
+        % (SEARCH_TABLE, ", ".join(str(weight) for weight in SEARCH_WEIGHTS))
+    )
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(" ".join(sql), params)
+        ids = [row[0] for row in cursor.fetchall()]
+
+    products = Product.objects.with_feature_image().in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from .category_index import invalidate_category_index
+from .facets import invalidate_facet_index, product_changed
+from .images import generate_derivatives
+from .models import (
+    Category,
+    Product,
+    ProductImage,
+    ProductSpecification,
+    ProductSpecificationValue,
+)
+from .page_cache import invalidate_catalog_pages
+from .search import index_products, remove_products
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+def category_changed(sender, **kwargs):
+    invalidate_category_index()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    index_products([instance.pk])
+    product_changed(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    remove_products([instance.pk])
+    product_changed(instance.pk)
+
+
+@receiver(post_save, sender=ProductSpecificationValue)
+@receiver(post_delete, sender=ProductSpecificationValue)
+def specification_value_changed(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).touch()
+    index_products([instance.product_id])
+    product_changed(instance.product_id)
+
+
+@receiver(post_save, sender=ProductSpecification)
+@receiver(post_delete, sender=ProductSpecification)
+def specification_changed(sender, **kwargs):
+    invalidate_facet_index()
+
+
+@receiver(post_save, sender=ProductImage)
+def product_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image:
+        generate_derivatives(instance.image.name)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).refresh_feature_images()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductSpecificationValue)
+@receiver(post_delete, sender=ProductSpecificationValue)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog_pages()
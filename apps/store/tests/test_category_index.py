@@ -0,0 +1,135 @@
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core.helpers import get_version
+from store.category_index import (
+    CATEGORY_NAMESPACE,
+    get_category_index,
+    get_navigation,
+)
+from store.context_processors import categories
+from store.models import Category, Product, ProductType
+
+
+class TestCategoryIndex(TestCase):
+    def setUp(self):
+        self.books = Category.objects.create(name="books", slug="books")
+        self.django = Category.objects.create(
+            name="django", slug="django", parent=self.books
+        )
+        self.python = Category.objects.create(
+            name="python", slug="python", parent=self.books
+        )
+        self.music = Category.objects.create(name="music", slug="music")
+        product_type = ProductType.objects.create(name="book")
+        for category in (self.django, self.python, self.music):
+            Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title="%s book" % category.name,
+                slug="%s-book" % category.slug,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+
+    def test_index_resolves_subtrees(self):
+        """
+        Test slugs resolve to nodes and subtrees to descendant id sets
+        """
+        index = get_category_index()
+        books = index.get("books")
+        self.assertEqual(
+            index.descendant_ids(books), {self.books.id, self.django.id, self.python.id}
+        )
+        self.assertEqual(
+            index.descendant_ids(books, include_self=False),
+            {self.django.id, self.python.id},
+        )
+        self.assertEqual(
+            [node.slug for node in index.children(books)], ["django", "python"]
+        )
+        self.assertIsNone(index.get("missing"))
+
+    def test_index_is_built_once(self):
+        """
+        Test repeated lookups do not query the category table again
+        """
+        get_category_index()
+        with self.assertNumQueries(0):
+            node = get_category_index().get("books")
+        products = Product.objects.filter(get_category_index().product_filter(node))
+        self.assertEqual(products.count(), 2)
+
+    def test_index_invalidated_on_change(self):
+        """
+        Test saving, moving and deleting categories rebuilds the index
+        """
+        get_category_index()
+        Category.objects.create(name="rust", slug="rust", parent=self.books)
+        self.assertIn("rust", get_category_index().by_slug)
+
+        self.python.move_to(self.music)
+        music = get_category_index().get("music")
+        self.assertIn(self.python.id, get_category_index().descendant_ids(music))
+
+        Category.objects.get(slug="rust").delete()
+        self.assertIsNone(get_category_index().get("rust"))
+
+    def test_index_invalidated_again_on_commit(self):
+        """
+        Test a change retires the index once more after its transaction
+        commits, dropping any copy built from the uncommitted rows
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="rust", slug="rust", parent=self.books)
+            version = get_version(CATEGORY_NAMESPACE)
+            self.assertIn("rust", get_category_index().by_slug)
+        self.assertGreater(get_version(CATEGORY_NAMESPACE), version)
+
+    def test_category_list_uses_subtree(self):
+        """
+        Test the category page lists products of the whole subtree
+        """
+        response = self.client.get(reverse("store:category_list", args=["books"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["products"]), 2)
+        response = self.client.get(reverse("store:category_list", args=["missing"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class TestNavigation(TestCase):
+    def setUp(self):
+        self.books = Category.objects.create(name="books", slug="books")
+        Category.objects.create(name="django", slug="django", parent=self.books)
+        Category.objects.create(name="hidden", slug="hidden", is_active=False)
+
+    def test_navigation_tree(self):
+        """
+        Test the navigation holds active roots with their children
+        """
+        navigation = get_navigation()
+        self.assertEqual([node.slug for node in navigation], ["books"])
+        self.assertEqual([node.slug for node in navigation[0].children], ["django"])
+        self.assertEqual(
+            navigation[0].url, reverse("store:category_list", args=["books"])
+        )
+
+    def test_navigation_costs_no_queries(self):
+        """
+        Test the nav is served from cache once built and rebuilt on change
+        """
+        get_navigation()
+        with self.assertNumQueries(0):
+            get_navigation()
+        Category.objects.create(name="music", slug="music")
+        self.assertEqual(
+            [node.slug for node in get_navigation()], ["books", "music"]
+        )
+
+    def test_context_processor_is_lazy(self):
+        """
+        Test pages that skip the menu never resolve the navigation
+        """
+        context = categories(RequestFactory().get("/"))
+        with self.assertNumQueries(0):
+            context["categories"]
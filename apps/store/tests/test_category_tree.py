@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from store.category_index import get_category_index
+from store.category_tree import (
+    CategoryTreeError,
+    bulk_create_categories,
+    rebuild_trees,
+)
+from store.models import Category
+
+TREE_COLUMNS = ("slug", "lft", "rght", "tree_id", "level")
+
+
+class TestCategoryTree(TestCase):
+    def setUp(self):
+        self.books = Category.objects.create(name="books", slug="books")
+        Category.objects.create(name="music", slug="music")
+
+    def tree(self):
+        return list(
+            Category.objects.order_by("tree_id", "lft").values_list(*TREE_COLUMNS)
+        )
+
+    def test_matches_per_row_inserts(self):
+        """
+        Test a bulk load leaves the same tree as creating each node in turn
+        """
+        rows = [
+            {"name": "python", "slug": "python", "parent": "books"},
+            {"name": "asyncio", "slug": "asyncio", "parent": "python"},
+            {"name": "django", "slug": "django", "parent": "python"},
+            {"name": "art", "slug": "art"},
+            {"name": "jazz", "slug": "jazz", "parent": "music"},
+            {"name": "blues", "slug": "blues", "parent": "music"},
+        ]
+        # Children listed before their parents are held back a generation
+        created = bulk_create_categories(list(reversed(rows)))
+        self.assertEqual(set(created), {row["slug"] for row in rows})
+        bulk = self.tree()
+
+        Category.objects.exclude(slug__in=["books", "music"]).delete()
+        Category.objects.rebuild()
+        for row in rows:
+            Category.objects.create(
+                name=row["name"],
+                slug=row["slug"],
+                parent=Category.objects.filter(slug=row.get("parent")).first(),
+            )
+        self.assertEqual(bulk, self.tree())
+        self.assertEqual(
+            [node.slug for node in get_category_index().roots()],
+            ["art", "books", "music"],
+        )
+
+    def test_partial_rebuild(self):
+        """
+        Test nodes added under one tree only renumber that tree
+        """
+        bulk_create_categories([{"name": "jazz", "slug": "jazz", "parent": "music"}])
+        music = Category.objects.get(slug="music")
+        self.assertEqual((music.lft, music.rght), (1, 4))
+        self.assertEqual(Category.objects.get(slug="jazz").tree_id, music.tree_id)
+
+        # A partial rebuild of a tree with correct columns only reads it,
+        # inside its savepoint
+        with self.assertNumQueries(3):
+            rebuild_trees([music.tree_id])
+
+    def test_rebuild_matches_mptt(self):
+        """
+        Test rebuild_trees numbers nodes exactly like TreeManager.rebuild
+        """
+        bulk_create_categories(
+            [
+                {"name": "n%s" % i, "slug": "n%s" % i, "parent": "books"}
+                for i in range(5)
+            ]
+            + [{"name": "m%s" % i, "slug": "m%s" % i, "parent": "n1"} for i in range(3)]
+        )
+        Category.objects.update(lft=0, rght=0, level=0)
+        Category.objects.rebuild()
+        expected = self.tree()
+        Category.objects.update(lft=0, rght=0, level=0)
+        rebuild_trees()
+        self.assertEqual(self.tree(), expected)
+
+    def test_errors(self):
+        """
+        Test unknown parents and existing slugs are refused
+        """
+        with self.assertRaises(CategoryTreeError):
+            bulk_create_categories([{"name": "x", "slug": "x", "parent": "nope"}])
+        with self.assertRaises(CategoryTreeError):
+            bulk_create_categories([{"name": "books 2", "slug": "books"}])
+        self.assertEqual(Category.objects.count(), 2)
+
+    def test_benchmark(self):
+        """
+        Test the benchmark runs both modes and leaves the database as it was
+        """
+        out = StringIO()
+        call_command("benchmark_categories", nodes=60, per_row_limit=20, stdout=out)
+        self.assertIn("per-row", out.getvalue())
+        self.assertIn("bulk", out.getvalue())
+        self.assertEqual(Category.objects.count(), 2)
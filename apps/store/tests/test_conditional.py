@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from store.models import (
+    Category,
+    Product,
+    ProductImage,
+    ProductSpecification,
+    ProductSpecificationValue,
+    ProductType,
+)
+from store.page_cache import page_cache_key
+
+
+@override_settings(STORE_PAGE_CACHE_SECONDS=60, STORE_PAGE_MAX_AGE=60)
+class TestConditionalGet(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="django", slug="django")
+        self.product_type = ProductType.objects.create(name="book")
+        self.product = Product.objects.create(
+            product_type=self.product_type,
+            category=category,
+            title="django beginners",
+            slug="django-beginners",
+            regular_price="20.00",
+            discount_price="15.00",
+        )
+        self.product_url = reverse("store:product_detail", args=["django-beginners"])
+        self.category_url = reverse("store:category_list", args=["django"])
+
+    def test_validators_and_cache_control(self):
+        """
+        Test product and category pages carry validators and may be cached
+        """
+        for url in (self.product_url, self.category_url):
+            response = self.client.get(url)
+            self.assertTrue(response.has_header("ETag"))
+            self.assertIn("public", response["Cache-Control"])
+            self.assertIn("max-age=60", response["Cache-Control"])
+            self.assertIn("Cookie", response["Vary"])
+        self.assertTrue(self.client.get(self.product_url).has_header("Last-Modified"))
+
+    def test_matching_etag_not_modified(self):
+        """
+        Test a matching If-None-Match is answered 304 before rendering
+        """
+        for url in (self.product_url, self.category_url):
+            etag = self.client.get(url)["ETag"]
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+            self.assertEqual(response.content, b"")
+
+    def test_not_modified_without_page_cache_entry(self):
+        """
+        Test the product validators are computed in one query when the page
+        is not cached
+        """
+        etag = self.client.get(self.product_url)["ETag"]
+        cache.delete(page_cache_key(RequestFactory().get(self.product_url)))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.product_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        """
+        Test If-Modified-Since is honoured when no ETag is sent
+        """
+        last_modified = self.client.get(self.product_url)["Last-Modified"]
+        response = self.client.get(
+            self.product_url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_alter_etag(self):
+        """
+        Test product, image and specification value changes retire the ETag
+        """
+        specification = ProductSpecification.objects.create(
+            product_type=self.product_type, name="pages"
+        )
+        changes = (
+            lambda: Product.objects.get(pk=self.product.pk).save(),
+            lambda: ProductImage.objects.create(product=self.product),
+            lambda: ProductSpecificationValue.objects.create(
+                product=self.product, specification=specification, value="300"
+            ),
+            lambda: Category.objects.create(name="python", slug="python"),
+        )
+        for change in changes:
+            with self.subTest(change=change):
+                etag = self.client.get(self.product_url)["ETag"]
+                change()
+                response = self.client.get(self.product_url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_logged_in_pages_private(self):
+        """
+        Test signed in customers get private, never 304, responses
+        """
+        etag = self.client.get(self.product_url)["ETag"]
+        user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        self.client.force_login(user)
+        response = self.client.get(self.product_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_old_cache_entries_ignored(self):
+        """
+        Test entries cached in the previous page format are not read back
+        """
+        request = RequestFactory().get(self.product_url)
+        key = page_cache_key(request)
+        self.assertTrue(key.startswith("store:page:v2:"))
+        cache.set(key.replace(":v2:", ":", 1), (b"old", "text/html"))
+        response = self.client.get(self.product_url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
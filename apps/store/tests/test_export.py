@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from store.category_index import get_category_index
+from store.export import MERCHANT_NAMESPACE, export_catalog, iter_products
+from store.models import (
+    Category,
+    Product,
+    ProductImage,
+    ProductSpecification,
+    ProductSpecificationValue,
+    ProductType,
+)
+
+
+class TestCatalogExport(TestCase):
+    def setUp(self):
+        books = Category.objects.create(name="books", slug="books")
+        self.django = Category.objects.create(
+            name="django", slug="django", parent=books
+        )
+        product_type = ProductType.objects.create(name="book")
+        author = ProductSpecification.objects.create(
+            product_type=product_type, name="author"
+        )
+        self.products = []
+        for i in range(5):
+            product = Product.objects.create(
+                product_type=product_type,
+                category=self.django,
+                title="book & %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+                is_active=i != 4,
+            )
+            ProductSpecificationValue.objects.create(
+                product=product, specification=author, value="author %s" % i
+            )
+            self.products.append(product)
+        ProductImage.objects.create(product=self.products[0], is_feature=True)
+
+    def test_records(self):
+        """
+        Test each record carries the category path, image and specifications
+        """
+        records = list(iter_products("http://shop.test/", chunk_size=2))
+        self.assertEqual([r["id"] for r in records], [p.id for p in self.products[:4]])
+        first = records[0]
+        self.assertEqual(first["link"], "http://shop.test/book-0")
+        self.assertEqual(first["category"], "books > django")
+        self.assertTrue(first["image_link"].startswith("http://shop.test/"))
+        self.assertEqual(first["specifications"], {"author": "author 0"})
+        self.assertEqual(records[1]["image_link"], "")
+
+        records = list(iter_products(include_inactive=True))
+        self.assertEqual(records[-1]["availability"], "out_of_stock")
+
+    def test_chunked_queries(self):
+        """
+        Test the export runs two queries per chunk, not per product
+        """
+        get_category_index()
+        # Chunks of 2, 2 and an empty one that ends the walk
+        with self.assertNumQueries(5):
+            list(iter_products(chunk_size=2))
+
+    def test_formats(self):
+        """
+        Test the CSV, JSON lines and XML writers produce parseable output
+        """
+        rows = list(csv.DictReader(io.StringIO("".join(export_catalog("csv")))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]["specifications"], "author: author 0")
+
+        lines = "".join(export_catalog("jsonl")).splitlines()
+        self.assertEqual(json.loads(lines[0])["title"], "book & 0")
+
+        feed = ElementTree.fromstring("".join(export_catalog("xml")))
+        items = feed.findall("channel/item")
+        self.assertEqual(len(items), 4)
+        self.assertEqual(items[0].find("title").text, "book & 0")
+        self.assertEqual(
+            items[0].find("{%s}sale_price" % MERCHANT_NAMESPACE).text, "15.00 GBP"
+        )
+
+    def test_view(self):
+        """
+        Test the export streams to staff only
+        """
+        url = reverse("store:catalog_export", args=["jsonl"])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = get_user_model().objects.create_user(
+            "staff@example.com", "staff", "password", is_active=True, is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertIn("catalog.jsonl", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[0])["link"], "http://testserver/book-0")
+
+        url = reverse("store:catalog_export", args=["pdf"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_command(self):
+        """
+        Test the command writes the feed to a file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "feed.xml")
+            call_command(
+                "export_catalog", format="xml", output=path, stdout=io.StringIO()
+            )
+            feed = ElementTree.parse(path)
+        self.assertEqual(len(feed.findall("channel/item")), 4)
@@ -0,0 +1,170 @@
+from django.db import DatabaseError, transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from store.category_index import get_category_index
+from store.facets import get_facet_index
+from store.models import (
+    Category,
+    Product,
+    ProductSpecification,
+    ProductSpecificationValue,
+    ProductType,
+)
+
+
+class TestFacets(TestCase):
+    def setUp(self):
+        self.books = Category.objects.create(name="books", slug="books")
+        self.django = Category.objects.create(
+            name="django", slug="django", parent=self.books
+        )
+        self.music = Category.objects.create(name="music", slug="music")
+        product_type = ProductType.objects.create(name="book")
+        self.author = ProductSpecification.objects.create(
+            product_type=product_type, name="author"
+        )
+        self.format = ProductSpecification.objects.create(
+            product_type=product_type, name="format"
+        )
+        self.products = {}
+        for slug, category, author, book_format in (
+            ("a", self.books, "vincent", "paper"),
+            ("b", self.django, "vincent", "ebook"),
+            ("c", self.django, "william", "paper"),
+            ("d", self.music, "vincent", "paper"),
+        ):
+            product = Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title=slug,
+                slug=slug,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            ProductSpecificationValue.objects.create(
+                product=product, specification=self.author, value=author
+            )
+            ProductSpecificationValue.objects.create(
+                product=product, specification=self.format, value=book_format
+            )
+            self.products[slug] = product
+
+    def scope(self, slug):
+        index = get_category_index()
+        return get_facet_index().scope(index.descendant_ids(index.get(slug)))
+
+    def counts(self, facets):
+        return {
+            facet.name: {item.value: item.count for item in facet.values}
+            for facet in facets
+        }
+
+    def test_combined_filters(self):
+        """
+        Test specifications are AND'ed and restricted to the subtree
+        """
+        matched, facets = get_facet_index().facets(
+            self.scope("books"),
+            {self.author.id: {"vincent"}, self.format.id: {"paper"}},
+        )
+        self.assertEqual(matched, {self.products["a"].id})
+
+    def test_facet_counts(self):
+        """
+        Test counts ignore the facet's own selection but honour the others
+        """
+        matched, facets = get_facet_index().facets(
+            self.scope("books"), {self.author.id: {"vincent"}}
+        )
+        self.assertEqual(matched, {self.products["a"].id, self.products["b"].id})
+        self.assertEqual(
+            self.counts(facets),
+            {
+                "author": {"vincent": 2, "william": 1},
+                "format": {"ebook": 1, "paper": 1},
+            },
+        )
+
+    def test_index_updated_incrementally(self):
+        """
+        Test changed values and deactivated products are reflected
+        """
+        get_facet_index()
+        value = ProductSpecificationValue.objects.get(
+            product=self.products["c"], specification=self.author
+        )
+        value.value = "vincent"
+        with self.captureOnCommitCallbacks(execute=True):
+            value.save()
+        matched, facets = get_facet_index().facets(
+            self.scope("django"), {self.author.id: {"vincent"}}
+        )
+        self.assertEqual(matched, {self.products["b"].id, self.products["c"].id})
+
+        self.products["b"].is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products["b"].save()
+        matched, facets = get_facet_index().facets(
+            self.scope("django"), {self.author.id: {"vincent"}}
+        )
+        self.assertEqual(matched, {self.products["c"].id})
+
+    def test_changes_replayed_without_rebuild(self):
+        """
+        Test a process patches its copy for the changed products rather
+        than rebuilding the index
+        """
+        index = get_facet_index()
+        value = ProductSpecificationValue.objects.get(
+            product=self.products["c"], specification=self.author
+        )
+        value.value = "vincent"
+        with self.captureOnCommitCallbacks(execute=True):
+            value.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products["a"].save()
+
+        with self.assertNumQueries(2):
+            self.assertIs(get_facet_index(), index)
+        self.assertIn(self.products["c"].id, index.postings[self.author.id]["vincent"])
+
+    def test_rolled_back_change_ignored(self):
+        """
+        Test a change rolled back before commit never reaches the index
+        """
+        index = get_facet_index()
+        value = ProductSpecificationValue.objects.get(
+            product=self.products["c"], specification=self.author
+        )
+        value.value = "vincent"
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    value.save()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertIs(get_facet_index(), index)
+        self.assertNotIn(
+            self.products["c"].id, index.postings[self.author.id]["vincent"]
+        )
+
+    def test_category_list_facets(self):
+        """
+        Test the category page filters on the selected facets
+        """
+        response = self.client.get(
+            reverse("store:category_list", args=["books"]),
+            {"f": ["%s:paper" % self.format.id, "%s:bogus" % self.author.id]},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["products"]), [])
+        response = self.client.get(
+            reverse("store:category_list", args=["books"]),
+            {"f": "%s:paper" % self.format.id},
+        )
+        self.assertEqual(
+            set(response.context["products"]), {self.products["a"], self.products["c"]}
+        )
+        self.assertIn("author", self.counts(response.context["facets"]))
@@ -0,0 +1,41 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from orders.models import Order
+from store.category_index import get_category_index
+from store.models import Category, Product, ProductSpecificationValue
+from store.search import search
+
+
+class TestGenerateCatalog(TestCase):
+    def test_generate_catalog(self):
+        """
+        Test the generator builds a valid tree, products and orders
+        """
+        call_command(
+            "generate_catalog",
+            products=120,
+            trees=2,
+            depth=3,
+            breadth=2,
+            customers=5,
+            orders=10,
+            batch_size=50,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Category.objects.count(), 2 * (1 + 2 + 4))
+        self.assertEqual(Product.objects.count(), 120)
+        self.assertEqual(ProductSpecificationValue.objects.count(), 120 * 4)
+        self.assertEqual(Order.objects.count(), 10)
+        self.assertFalse(Product.objects.filter(feature_image=None).exists())
+
+        root = Category.objects.get(level=0, tree_id=1)
+        self.assertEqual(root.get_descendant_count(), 6)
+        node = get_category_index().get(root.slug)
+        self.assertEqual(
+            Product.objects.filter(get_category_index().product_filter(node)).count(),
+            Product.objects.filter(category__tree_id=1).count(),
+        )
+        self.assertTrue(search("django"))
@@ -0,0 +1,148 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from store.images import derivative_name, derivative_names
+from store.models import Category, Product, ProductImage, ProductType
+
+
+def make_image(name, size=(600, 800), fmt="JPEG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class MediaTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        cache.clear()
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.product = Product.objects.create(
+            product_type=product_type,
+            category=category,
+            title="django",
+            slug="django",
+            regular_price="20.00",
+            discount_price="15.00",
+        )
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+
+class TestImageDerivatives(MediaTestCase):
+    def test_derivative_names(self):
+        """
+        Test derivatives are named deterministically next to the original
+        """
+        self.assertEqual(
+            derivative_name("images/cover.JPG", "small", "webp"),
+            "images/cover_200x300.webp",
+        )
+        self.assertEqual(
+            derivative_name("images/cover.png", "large"), "images/cover_400x600.png"
+        )
+
+    def test_thumbnails_built_on_upload(self):
+        """
+        Test saving a product image writes every size in both formats
+        """
+        image = ProductImage.objects.create(
+            product=self.product, image=make_image("cover.jpg"), is_feature=True
+        )
+        for name in derivative_names(image.image.name):
+            self.assertTrue(default_storage.exists(name), name)
+        with default_storage.open(derivative_name(image.image.name, "small")) as f:
+            self.assertEqual(Image.open(f).size, (200, 300))
+        self.assertIn("_400x600.webp 2x", image.webp_srcset)
+
+    def test_original_served_until_derivatives_exist(self):
+        """
+        Test images without derivatives, such as the default image, link the
+        original and offer no WebP source
+        """
+        image = ProductImage.objects.create(product=self.product)
+        self.assertFalse(image.has_derivatives)
+        self.assertEqual(image.thumbnail_url, image.image.url)
+        self.assertEqual(image.large_webp_url, image.image.url)
+        response = self.client.get(self.product.get_absolute_url())
+        self.assertContains(response, 'src="%s"' % image.image.url)
+        self.assertNotContains(response, "image/webp")
+
+    def test_backfill_command(self):
+        """
+        Test the backfill command rebuilds missing derivatives
+        """
+        image = ProductImage.objects.create(
+            product=self.product, image=make_image("cover.png", fmt="PNG")
+        )
+        for name in derivative_names(image.image.name):
+            default_storage.delete(name)
+        out = StringIO()
+        call_command("generate_thumbnails", workers=1, stdout=out)
+        self.assertIn("wrote 4 derivatives", out.getvalue())
+        for name in derivative_names(image.image.name):
+            self.assertTrue(default_storage.exists(name), name)
+
+
+class TestFeatureImage(MediaTestCase):
+    def test_feature_image_follows_images(self):
+        """
+        Test feature_image tracks flag changes and deletions
+        """
+        first = ProductImage.objects.create(
+            product=self.product, image=make_image("a.jpg"), is_feature=True
+        )
+        second = ProductImage.objects.create(
+            product=self.product, image=make_image("b.jpg")
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.feature_image, first)
+
+        second.is_feature = True
+        second.save()
+        first.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.feature_image, second)
+
+        second.is_feature = False
+        second.save()
+        self.product.refresh_from_db()
+        self.assertIsNone(self.product.feature_image)
+
+    def test_listing_loads_one_image_per_product(self):
+        """
+        Test the home page query count does not grow with the product count
+        """
+        ProductImage.objects.create(
+            product=self.product, image=make_image("a.jpg"), is_feature=True
+        )
+        for i in range(5):
+            product = Product.objects.create(
+                product_type=self.product.product_type,
+                category=self.product.category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            ProductImage.objects.create(
+                product=product, image=make_image("%s.jpg" % i), is_feature=True
+            )
+            ProductImage.objects.create(product=product, image=make_image("x.jpg"))
+
+        products = list(Product.objects.with_feature_image())
+        with self.assertNumQueries(0):
+            urls = [product.feature_image.thumbnail_url for product in products]
+        self.assertEqual(len(urls), 6)
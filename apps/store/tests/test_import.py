@@ -0,0 +1,191 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from store.export import export_catalog
+from store.importer import import_catalog, open_text
+from store.models import (
+    Category,
+    Product,
+    ProductSpecification,
+    ProductSpecificationValue,
+    ProductType,
+)
+from store.search import search
+
+CSV = """title,category,product_type,regular_price,discount_price,specifications
+Django for beginners,django,Book,20.00,15.00,author: vincent; format: ebook
+Django for beginners,books > django,Book,21.00,,author: william
+Unknown,music,Book,10.00,,
+Too dear,django,Book,1000.00,,
+"""
+
+
+class TestCatalogImport(TestCase):
+    def setUp(self):
+        books = Category.objects.create(name="books", slug="books")
+        Category.objects.create(name="django", slug="django", parent=books)
+
+    def test_csv(self):
+        """
+        Test rows are created with unique slugs and bad rows are reported
+        """
+        result = import_catalog(io.StringIO(CSV), "csv")
+        self.assertEqual((result.created, result.updated), (2, 0))
+        self.assertEqual([line for line, error in result.errors], [3, 4])
+
+        first, second = Product.objects.order_by("id")
+        self.assertEqual(first.slug, "django-for-beginners")
+        self.assertEqual(second.slug, "django-for-beginners-2")
+        self.assertEqual(str(second.discount_price), "21.00")
+        self.assertEqual(
+            dict(
+                ProductSpecificationValue.objects.filter(product=first).values_list(
+                    "specification__name", "value"
+                )
+            ),
+            {"author": "vincent", "format": "ebook"},
+        )
+        self.assertEqual(ProductType.objects.count(), 1)
+        self.assertEqual(ProductSpecification.objects.count(), 2)
+        self.assertEqual({p.id for p in search("beginners")}, {first.id, second.id})
+
+    def test_round_trip_updates(self):
+        """
+        Test importing an export updates the products in place
+        """
+        import_catalog(io.StringIO(CSV), "csv")
+        exported = "".join(export_catalog("jsonl"))
+        rows = [json.loads(line) for line in exported.splitlines()]
+        for row in rows:
+            row["regular_price"] = "30.00"
+            row["specifications"] = {"author": "ada"}
+        stream = io.StringIO("".join(json.dumps(row) + "\n" for row in rows))
+
+        result = import_catalog(stream, "jsonl", default_product_type="Book")
+        self.assertEqual((result.created, result.updated), (0, 2))
+        self.assertEqual(
+            set(Product.objects.values_list("regular_price", flat=True)),
+            {Decimal("30.00")},
+        )
+        self.assertEqual(
+            set(ProductSpecificationValue.objects.values_list("value", flat=True)),
+            {"ada"},
+        )
+
+    def test_chunks(self):
+        """
+        Test the query count depends on the number of chunks, not rows
+        """
+        rows = "".join(
+            json.dumps(
+                {
+                    "title": "book %s" % i,
+                    "category": "django",
+                    "regular_price": "9.99",
+                    "specifications": {"author": "author %s" % i},
+                }
+            )
+            + "\n"
+            for i in range(500)
+        )
+        ProductSpecification.objects.create(
+            product_type=ProductType.objects.create(name="Book"), name="author"
+        )
+        # 4 lookups, then 7 statements per chunk
+        with self.assertNumQueries(18):
+            result = import_catalog(
+                io.StringIO(rows), "jsonl", chunk_size=250, default_product_type="Book"
+            )
+        self.assertEqual(result.created, 500)
+        self.assertEqual(Product.objects.values("slug").distinct().count(), 500)
+
+    def test_unparseable_lines_reported(self):
+        """
+        Test malformed JSON and undecodable bytes are row errors, not a
+        failed import
+        """
+        rows = (
+            b'{"title": "Django", "category": "django", "regular_price": "20.00"}\n'
+            b"{not json\n"
+            b'{"title": "\xff", "category": "django", "regular_price": "20.00"}\n'
+            b"[1, 2]\n"
+            b'{"title": "Python", "category": "django", "regular_price": "10.00"}\n'
+        )
+        result = import_catalog(
+            open_text(io.BytesIO(rows)), "jsonl", default_product_type="Book"
+        )
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, error in result.errors], [2, 3, 4])
+        self.assertIn("invalid JSON", result.errors[0][1])
+        self.assertEqual(result.errors[1][1], "not valid UTF-8")
+
+        result = import_catalog(
+            open_text(io.BytesIO(CSV.encode() + b"Caf\xe9,django,Book,5.00,,\n")),
+            "csv",
+        )
+        self.assertEqual(result.errors[-1], (5, "not valid UTF-8"))
+
+    def test_command(self):
+        """
+        Test the command imports a file and reports throughput
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.csv")
+            with open(path, "w") as f:
+                f.write(CSV)
+            out, err = io.StringIO(), io.StringIO()
+            call_command("import_catalog", path, stdout=out, stderr=err)
+        self.assertIn("2 created, 0 updated, 2 errors", out.getvalue())
+        self.assertIn("products/s", out.getvalue())
+        self.assertIn("line 3: unknown category 'music'", err.getvalue())
+
+    def test_admin_upload(self):
+        """
+        Test staff can upload a catalog file from the product admin
+        """
+        admin = get_user_model().objects.create_superuser(
+            "admin@example.com", "admin", "password"
+        )
+        self.client.force_login(admin)
+        url = reverse("admin:store_product_import")
+        self.assertContains(
+            self.client.get(reverse("admin:store_product_changelist")), url
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        upload = SimpleUploadedFile("catalog.csv", CSV.encode())
+        response = self.client.post(url, {"file": upload}, follow=True)
+        self.assertContains(response, "2 created, 0 updated, 2 errors")
+        self.assertEqual(Product.objects.count(), 2)
+
+        upload = SimpleUploadedFile("catalog.xls", b"title")
+        response = self.client.post(url, {"file": upload})
+        self.assertContains(response, "Upload a .csv or .jsonl file.")
+
+    def test_admin_upload_needs_change_permission(self):
+        """
+        Test the upload, which updates matching products, needs the change
+        permission as well as add
+        """
+        staff = get_user_model().objects.create_user(
+            "staff@example.com", "staff", "password", is_active=True
+        )
+        staff.is_staff = True
+        staff.save()
+        staff.user_permissions.add(Permission.objects.get(codename="add_product"))
+        self.client.force_login(staff)
+        url = reverse("admin:store_product_import")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        staff.user_permissions.add(Permission.objects.get(codename="change_product"))
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from store.models import Category, Product, ProductType
+
+
+@override_settings(STORE_PAGE_CACHE_SECONDS=60)
+class TestPageCache(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.product = Product.objects.create(
+            product_type=product_type,
+            category=category,
+            title="django beginners",
+            slug="django-beginners",
+            regular_price="20.00",
+            discount_price="15.00",
+        )
+
+    def test_anonymous_pages_cached(self):
+        """
+        Test catalog pages are served from cache on the second hit
+        """
+        for url in (
+            reverse("store:store_home"),
+            reverse("store:category_list", args=["django"]),
+            reverse("store:product_detail", args=["django-beginners"]),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response["X-Page-Cache"], "miss")
+            with self.assertNumQueries(0):
+                cached = self.client.get(url)
+            self.assertEqual(cached["X-Page-Cache"], "hit")
+            self.assertEqual(cached.content, response.content)
+            self.assertContains(cached, reverse("basket:basket_state"))
+
+    def test_cache_invalidated_by_product_change(self):
+        """
+        Test a product change retires the cached pages
+        """
+        url = reverse("store:store_home")
+        self.client.get(url)
+        self.product.title = "django for professionals"
+        self.product.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "django for professionals")
+
+    def test_logged_in_users_bypass_cache(self):
+        """
+        Test signed in customers always get a freshly rendered page
+        """
+        user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        self.client.force_login(user)
+        response = self.client.get(reverse("store:store_home"))
+        self.assertFalse(response.has_header("X-Page-Cache"))
+
+    def test_basket_state(self):
+        """
+        Test the basket fragment endpoint returns the visitor's quantity
+        """
+        self.client.post(
+            reverse("basket:basket_add"),
+            {"productid": self.product.id, "productqty": 3, "action": "post"},
+        )
+        response = self.client.get(reverse("basket:basket_state"))
+        self.assertEqual(response.json(), {"qty": 3})
+        self.assertIn("csrftoken", response.cookies)
+
+    def test_untracked_parameters_share_entry(self):
+        """
+        Test query parameters a page does not use share its cache entry
+        """
+        url = reverse("store:category_list", args=["django"])
+        self.client.get(url)
+        response = self.client.get(url + "?utm_source=mail&x=1")
+        self.assertEqual(response["X-Page-Cache"], "hit")
+
+        response = self.client.get(url + "?f=1:a")
+        self.assertEqual(response["X-Page-Cache"], "miss")
+
+    def test_add_button_waits_for_csrf_cookie(self):
+        """
+        Test the shared product page disables adding until the CSRF cookie
+        has been set
+        """
+        response = self.client.get(
+            reverse("store:product_detail", args=["django-beginners"])
+        )
+        self.assertContains(response, "disabled data-needs-csrf")
+
+    def test_pages_retired_again_on_commit(self):
+        """
+        Test a product change retires the cached pages once more after it
+        commits
+        """
+        url = reverse("store:store_home")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+            self.client.get(url)
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "miss")
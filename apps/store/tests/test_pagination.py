@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from store.models import Category, Product, ProductType
+from store.pagination import KeysetPaginator, decode_cursor, encode_cursor
+
+
+class TestKeysetPagination(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        for i in range(7):
+            Product.objects.create(
+                product_type=product_type,
+                category=self.category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+        # force ties on created_at so the id tie breaker is exercised
+        Product.objects.update(created_at=timezone.now())
+
+    def test_cursor_round_trip(self):
+        """
+        Test a cursor token decodes back to the position it was built from
+        """
+        now = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(now, 5)), (now, 5, "next"))
+        self.assertEqual(
+            decode_cursor(encode_cursor(now, 5, "previous")), (now, 5, "previous")
+        )
+
+    def test_walk_forward_and_back(self):
+        """
+        Test paging forward then backward visits every product exactly once
+        """
+        paginator = KeysetPaginator(Product.objects.all(), 3)
+        expected = list(Product.objects.order_by("-created_at", "-id"))
+
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertEqual(list(first) + list(second) + list(third), expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+
+        back = paginator.page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertTrue(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_pages_do_not_count(self):
+        """
+        Test fetching a page issues a single query and no COUNT(*)
+        """
+        paginator = KeysetPaginator(Product.objects.all(), 3)
+        cursor = paginator.page().next_cursor
+        with self.assertNumQueries(1):
+            list(paginator.page(cursor))
+
+    def test_views_paginate(self):
+        """
+        Test the home page and category list render a keyset page
+        """
+        for url in (
+            reverse("store:store_home"),
+            reverse("store:category_list", args=["django"]),
+        ):
+            response = self.client.get(url, {"cursor": "not-a-cursor"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context["products"]), 7)
+            self.assertFalse(response.context["page_obj"].has_next())
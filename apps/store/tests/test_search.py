@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from store.category_index import get_category_index
+from store.models import (
+    Category,
+    Product,
+    ProductSpecification,
+    ProductSpecificationValue,
+    ProductType,
+)
+from store.search import build_match_query, search
+
+
+class TestProductSearch(TestCase):
+    def setUp(self):
+        self.books = Category.objects.create(name="books", slug="books")
+        self.music = Category.objects.create(name="music", slug="music")
+        product_type = ProductType.objects.create(name="book")
+        self.author = ProductSpecification.objects.create(
+            product_type=product_type, name="author"
+        )
+
+        def create(title, category, description=""):
+            return Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title=title,
+                description=description,
+                slug=title.replace(" ", "-"),
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+
+        self.django = create("django for beginners", self.books)
+        self.advanced = create("advanced python", self.books, "covers django too")
+        self.album = create("django reinhardt", self.music)
+        ProductSpecificationValue.objects.create(
+            product=self.advanced, specification=self.author, value="guido"
+        )
+
+    def test_match_query(self):
+        """
+        Test user input becomes quoted prefix terms
+        """
+        self.assertEqual(build_match_query('Djan "go'), '"djan"* "go"*')
+        self.assertEqual(build_match_query("  "), "")
+
+    def test_ranked_prefix_search(self):
+        """
+        Test title matches outrank description matches and prefixes match
+        """
+        results = search("djan")
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[-1], self.advanced)
+        self.assertEqual(search("guid"), [self.advanced])
+
+    def test_category_filter(self):
+        """
+        Test results are restricted to the category subtree
+        """
+        music = get_category_index().get("music")
+        self.assertEqual(search("django", category=music), [self.album])
+
+    def test_index_follows_changes(self):
+        """
+        Test saves, deactivation and deletes keep the index in sync
+        """
+        self.album.title = "minor swing"
+        self.album.save()
+        self.assertEqual(search("swing"), [self.album])
+
+        self.album.is_active = False
+        self.album.save()
+        self.assertEqual(search("swing"), [])
+
+        self.django.delete()
+        self.assertEqual(search("beginners"), [])
+
+    def test_rebuild_command(self):
+        """
+        Test the rebuild command restores a wiped index
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM store_product_fts")
+        self.assertEqual(search("django"), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(len(search("django")), 3)
+
+    def test_search_view(self):
+        """
+        Test the search page renders ranked results
+        """
+        response = self.client.get(
+            reverse("store:search"), {"q": "django", "category": "books"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context["products"]), [self.django, self.advanced]
+        )
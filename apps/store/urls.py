@@ -7,6 +7,12 @@ app_name = "store"
 
 urlpatterns = [
     path("", views.AllProducts.as_view(), name="store_home"),
+    path("search/", views.ProductSearch.as_view(), name="search"),
+    path(
+        "export/catalog.<slug:export_format>",
+        views.catalog_export,
+        name="catalog_export",
+    ),
     path("<slug:slug>", views.ProductDetail.as_view(), name="product_detail"),
     path(
         "shop/<slug:category_slug>/", views.CategoryList.as_view(), name="category_list"
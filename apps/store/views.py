@@ -1,68 +1,168 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.views.generic import DetailView, ListView
 
-from .models import Category, Product
+from account.wishlist import in_wishlist
+from core.helpers import get_version
 
+from .category_index import CATEGORY_NAMESPACE, get_category_index
+from .export import FORMATS, export_catalog
+from .facets import FACET_PARAM, get_facet_index, parse_selection
+from .models import Product, ProductSpecificationValue
+from .page_cache import CachedPageMixin, make_etag, page_cache_key
+from .pagination import KeysetPaginationMixin
+from .search import search
 
-class AllProducts(ListView):
+
+class AllProducts(CachedPageMixin, KeysetPaginationMixin, ListView):
     """ "Return products that are in stock"""
 
     template_name = "store/index.html"
-    queryset = (
-        Product.objects.all().prefetch_related("product_image").filter(is_active=True)
-    )
+    page_cache_params = ("cursor",)
+    queryset = Product.objects.with_feature_image().filter(is_active=True)
 
     # some_product = queryset.first()
     # some_product.product_image.filter(is_active=True)
     context_object_name = "products"
 
 
-class CategoryList(DetailView):
+class CategoryList(CachedPageMixin, KeysetPaginationMixin, DetailView):
     """Return all the products of the selected category."""
 
     template_name = "store/category.html"
+    context_object_name = "category"
+    page_cache_params = ("cursor", FACET_PARAM)
 
     def get_object(self):
-        category_slug = self.kwargs.get("category_slug")
-        return get_object_or_404(Category, slug=category_slug)
+        category = get_category_index().get(self.kwargs.get("category_slug"))
+        if category is None:
+            raise Http404("No category matches the given query.")
+        return category
+
+    def get_validators(self):
+        # Listings change with any product, so the page has no cheaper
+        # validator than its cache key, built from the catalog and category
+        # versions
+        return make_etag(page_cache_key(self.request)), None
+
+    # Above this many matches the facet filter is pushed down to SQL
+    # instead of passing the matching ids as query parameters.
+    max_facet_ids = 5000
 
     def get_queryset(self):
-        c_node = Category.objects.get(name=self.kwargs["category_slug"]).is_child_node()
-        query_set = Product.objects.filter(
-            category__in=Category.objects.get(
-                name=self.kwargs["category_slug"]
-            ).get_family()
-            if not c_node
-            else c_node
+        query_set = (
+            Product.objects.with_feature_image()
+            .filter(is_active=True)
+            .filter(get_category_index().product_filter(self.object))
         )
-        print(query_set)
+        return query_set
+
+    def filter_by_facets(self, query_set, selected, matched):
+        if len(matched) <= self.max_facet_ids:
+            return query_set.filter(id__in=matched)
+        for specification_id, values in selected.items():
+            query_set = query_set.filter(
+                id__in=ProductSpecificationValue.objects.filter(
+                    specification_id=specification_id, value__in=values
+                ).values("product_id")
+            )
         return query_set
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["category"] = self.get_object
-        context["products"] = self.get_queryset
+        facet_index = get_facet_index()
+        selected = parse_selection(self.request.GET)
+        scope = facet_index.scope(get_category_index().descendant_ids(self.object))
+        matched, facets = facet_index.facets(scope, selected, self.request.GET)
+
+        query_set = self.get_queryset()
+        if selected:
+            query_set = self.filter_by_facets(query_set, selected, matched)
+
+        paginator, page, products, is_paginated = self.paginate_queryset(
+            query_set, self.paginate_by
+        )
+        context["facets"] = facets
+        context["page_obj"] = page
+        context["is_paginated"] = is_paginated
+        context["products"] = products
         return context
 
 
-class ProductDetail(DetailView):
+class ProductSearch(ListView):
+    """Return the active products best matching the search terms."""
+
+    template_name = "store/search.html"
+    context_object_name = "products"
+    search_limit = 50
+
+    def get_category(self):
+        slug = self.request.GET.get("category")
+        return get_category_index().get(slug) if slug else None
+
+    def get_queryset(self):
+        query = self.request.GET.get("q", "").strip()
+        return search(query, category=self.get_category(), limit=self.search_limit)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["query"] = self.request.GET.get("q", "").strip()
+        context["search_category"] = self.get_category()
+        return context
+
+
+class ProductDetail(CachedPageMixin, DetailView):
     template_name = "store/single.html"
     context_object_name = "product"
 
     def get_object(self):
-        slug = self.kwargs.get("slug")
-        return get_object_or_404(Product, slug=slug, is_active=True)
+        # Loaded once, for the validators and then for rendering
+        if not hasattr(self, "product"):
+            slug = self.kwargs.get("slug")
+            self.product = get_object_or_404(self.get_queryset(), slug=slug)
+        return self.product
 
     def get_queryset(self):
-        query_set = Product.objects.filter(
-            category__in=Category.objects.get(name="django").get_descendants(
-                include_self=True
-            )
-        )
+        query_set = Product.objects.filter(is_active=True).with_last_modified()
         return query_set
-    
+
+    def get_validators(self):
+        # Image changes show in last_modified and specification value
+        # changes touch the product; the category version covers the
+        # breadcrumb and navigation
+        product = self.get_object()
+        return (
+            make_etag(
+                product.pk,
+                product.last_modified.timestamp(),
+                get_version(CATEGORY_NAMESPACE),
+            ),
+            product.last_modified,
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["wishlist"] = list(Product.objects.filter(users_wishlist=self.request.user))
-        print(context['wishlist'])
+        context["category"] = get_category_index().get_by_id(self.object.category_id)
+        context["in_wishlist"] = in_wishlist(self.request.user, self.object.id)
         return context
+
+
+@staff_member_required
+def catalog_export(request, export_format):
+    """
+    Stream the whole catalog as CSV, JSON lines or a merchant XML feed.
+    """
+    if export_format not in FORMATS:
+        raise Http404
+    _, content_type, extension = FORMATS[export_format]
+    response = StreamingHttpResponse(
+        export_catalog(
+            export_format,
+            base_url=request.build_absolute_uri("/"),
+            include_inactive="inactive" in request.GET,
+        ),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = 'attachment; filename="catalog.%s"' % extension
+    return response
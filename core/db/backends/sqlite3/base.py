@@ -0,0 +1,65 @@
+from django.db.backends.sqlite3 import base
+
+Database = base.Database
+
+# Applied to every new connection. WAL lets readers work alongside a writer,
+# busy_timeout makes a writer wait for the lock instead of failing with
+# "database is locked".
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+    "temp_store": "memory",
+}
+
+
+def apply_pragmas(connection, pragmas):
+    """
+    Run PRAGMA statements on a raw sqlite3 connection, in order.
+    """
+    for name, value in pragmas.items():
+        connection.execute("PRAGMA %s = %s" % (name, value))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The SQLite backend tuned for a multi-process web server.
+
+    OPTIONS accepts, besides the sqlite3.connect() arguments:
+      "pragmas"           overrides for DEFAULT_PRAGMAS; None drops a pragma
+      "transaction_mode"  "DEFERRED" (SQLite's default) or "IMMEDIATE";
+                          IMMEDIATE takes the write lock at BEGIN, where a
+                          busy writer can still be waited for, instead of
+                          failing when a read transaction upgrades.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pragmas", None)
+        params.pop("transaction_mode", None)
+        return params
+
+    def get_pragmas(self):
+        options = self.settings_dict["OPTIONS"]
+        pragmas = {**DEFAULT_PRAGMAS, **options.get("pragmas", {})}
+        if self.is_in_memory_db():
+            pragmas.pop("journal_mode", None)
+        return {name: value for name, value in pragmas.items() if value is not None}
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.get_pragmas())
+        return conn
+
+    def is_usable(self):
+        try:
+            self.connection.execute("SELECT 1")
+        except Database.Error:
+            return False
+        return True
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode", "DEFERRED")
+        self.cursor().execute("BEGIN %s" % mode.upper())
@@ -1 +1,45 @@
+import time
 
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(namespace):
+    return "version:%s" % namespace
+
+
+def get_version(namespace):
+    """
+    Return the current version number of a cached namespace.
+
+    Versions start from the current time in milliseconds so a flushed cache
+    never hands out a number that an in-process copy is still holding.
+    """
+    return cache.get_or_set(
+        version_key(namespace), lambda: int(time.time() * 1000), timeout=None
+    )
+
+
+def bump_version(namespace):
+    """
+    Invalidate every cache entry built from a namespace by moving it to a
+    new version. Old entries are left to expire on their own.
+    """
+    key = version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(namespace)
+
+
+def invalidate_on_commit(invalidate):
+    """
+    Call invalidate now, so this process reads its own writes, and again
+    once the current transaction commits.
+
+    Between the two another process may rebuild from the rows as they were
+    before the commit; the second call retires whatever it cached.
+    """
+    invalidate()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(invalidate)
@@ -0,0 +1,276 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.models import Address
+from checkout.reference import get_delivery_options
+from store.category_index import get_category_index
+from store.models import Category, Product
+from store.pagination import KeysetPaginator
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Scenario:
+    """
+    One request replayed by the benchmark.
+    """
+
+    def __init__(self, name, url, method="get", data=None, customer=False, **extra):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data
+        self.customer = customer
+        self.extra = extra
+
+    def run(self, client):
+        return getattr(client, self.method)(self.url, self.data, **self.extra)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the main store, basket and checkout requests through the test "
+        "client and write latency, query count and memory to a JSON report. "
+        "Runs against the configured database; fill it with generate_catalog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--output", default="benchmark.json")
+        parser.add_argument(
+            "--compare", help="A previous report to print the p50 change against."
+        )
+        parser.add_argument(
+            "--only", nargs="+", help="Run only the scenarios with these names."
+        )
+
+    def handle(self, *args, **options):
+        scenarios = self.get_scenarios()
+        if options["only"]:
+            scenarios = [s for s in scenarios if s.name in options["only"]]
+
+        anonymous = Client(SERVER_NAME="127.0.0.1")
+        customer = Client(SERVER_NAME="127.0.0.1")
+        customer.force_login(self.get_customer())
+
+        results = {}
+        for scenario in scenarios:
+            client = customer if scenario.customer else anonymous
+            results[scenario.name] = self.measure(client, scenario, options)
+            self.stdout.write(
+                "%-24s p50 %7.2fms  p95 %7.2fms  p99 %7.2fms  %3s queries  %7.1fKiB"
+                % (
+                    scenario.name,
+                    results[scenario.name]["p50_ms"],
+                    results[scenario.name]["p95_ms"],
+                    results[scenario.name]["p99_ms"],
+                    results[scenario.name]["queries"],
+                    results[scenario.name]["peak_memory_kib"],
+                )
+            )
+
+        report = {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "dataset": {
+                "products": Product.objects.count(),
+                "categories": Category.objects.count(),
+            },
+            "results": results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS("Wrote %s" % options["output"]))
+
+        if options["compare"]:
+            self.compare(report, options["compare"])
+
+    def get_customer(self):
+        """
+        Return the dedicated benchmark customer, never a real one, as the
+        scenarios log in as it and change its basket and delivery choice.
+        """
+        customer, created = get_user_model().objects.get_or_create(
+            email="benchmark@example.com",
+            defaults={"name": "Benchmark", "is_active": True},
+        )
+        Address.objects.get_or_create(
+            customer=customer,
+            defaults={
+                "full_name": "Benchmark",
+                "phone": "0123456789",
+                "postcode": "AB1 2CD",
+                "address_line": "1 High Street",
+                "address_line2": "",
+                "town_city": "London",
+                "delivery_instructions": "",
+                "default": True,
+            },
+        )
+        return customer
+
+    def get_scenarios(self):
+        products = Product.objects.filter(is_active=True)
+        first_page = KeysetPaginator(products, 20).page()
+        if not first_page.object_list:
+            raise CommandError("No products to benchmark; run generate_catalog first.")
+        product = first_page.object_list[0]
+
+        index = get_category_index()
+        root = index.roots()[0]
+        leaf = index.get_by_id(product.category_id)
+        delivery = get_delivery_options()
+        batch = json.dumps(
+            {
+                "operations": [
+                    {"action": "add", "productid": item.id, "productqty": 1}
+                    for item in first_page.object_list[:5]
+                ]
+            }
+        )
+
+        scenarios = [
+            Scenario("store_home", reverse("store:store_home")),
+            Scenario(
+                "store_home_page_2",
+                "%s?cursor=%s" % (reverse("store:store_home"), first_page.next_cursor),
+            ),
+            Scenario("category_list_root", root.get_absolute_url()),
+            Scenario("category_list_leaf", leaf.get_absolute_url()),
+            Scenario("product_detail", product.get_absolute_url()),
+            Scenario("search", reverse("store:search"), data={"q": product.title}),
+            Scenario("store_home_customer", reverse("store:store_home"), customer=True),
+            Scenario(
+                "basket_add",
+                reverse("basket:basket_add"),
+                method="post",
+                data={"productid": product.id, "productqty": 2, "action": "post"},
+                customer=True,
+            ),
+            Scenario(
+                "basket_batch",
+                reverse("basket:basket_batch"),
+                method="post",
+                data=batch,
+                content_type="application/json",
+                customer=True,
+            ),
+            Scenario("basket_summary", reverse("basket:basket_summary"), customer=True),
+            Scenario("basket_state", reverse("basket:basket_state"), customer=True),
+            Scenario(
+                "delivery_choices", reverse("checkout:deliverychoices"), customer=True
+            ),
+        ]
+        if delivery:
+            scenarios += [
+                Scenario(
+                    "basket_update_delivery",
+                    reverse("checkout:basket_update_delivery"),
+                    method="post",
+                    data={"deliveryoption": delivery[0].id, "action": "post"},
+                    customer=True,
+                ),
+                Scenario(
+                    "delivery_address",
+                    reverse("checkout:delivery_address"),
+                    customer=True,
+                ),
+                Scenario(
+                    "payment_selection",
+                    reverse("checkout:payment_selection"),
+                    customer=True,
+                ),
+            ]
+        return scenarios
+
+    def measure(self, client, scenario, options):
+        for _ in range(options["warmup"]):
+            response = scenario.run(client)
+        if options["warmup"] and response.status_code >= 400:
+            raise CommandError(
+                "%s returned %s" % (scenario.name, response.status_code)
+            )
+
+        timings = []
+        queries = []
+        for _ in range(options["iterations"]):
+            # Reads may be routed to replicas, so count on every alias
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connections[alias]))
+                    for alias in connections
+                ]
+                start = time.perf_counter()
+                response = scenario.run(client)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(sum(len(context) for context in captured))
+
+        # Memory is traced in a separate pass, tracemalloc slows every
+        # allocation down and would skew the timings.
+        tracemalloc.start()
+        scenario.run(client)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            "status": response.status_code,
+            "mean_ms": statistics.mean(timings),
+            "min_ms": min(timings),
+            "p50_ms": percentile(timings, 0.5),
+            "p95_ms": percentile(timings, 0.95),
+            "p99_ms": percentile(timings, 0.99),
+            "max_ms": max(timings),
+            "queries": int(statistics.median(queries)),
+            "peak_memory_kib": peak / 1024,
+        }
+
+    def compare(self, report, path):
+        with open(path) as f:
+            previous = json.load(f)
+        self.stdout.write(
+            "\nAgainst %s (%s):" % (path, previous.get("commit") or "unknown commit")
+        )
+        for name, result in report["results"].items():
+            before = previous["results"].get(name)
+            if before is None:
+                continue
+            change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            self.stdout.write(
+                "%-24s p50 %+6.1f%%  queries %+d"
+                % (name, change, result["queries"] - before["queries"])
+            )
@@ -0,0 +1,139 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.db.backends.sqlite3.base import DEFAULT_PRAGMAS, apply_pragmas
+
+ROWS = 10000
+
+# "before" is the stock Django setup: rollback journal, a connection per
+# request and deferred transactions. "after" is core.db.backends.sqlite3
+# with its default settings.
+CONFIGURATIONS = {
+    "before": {"pragmas": {}, "persistent": False, "begin": "BEGIN"},
+    "after": {
+        "pragmas": DEFAULT_PRAGMAS,
+        "persistent": True,
+        "begin": "BEGIN IMMEDIATE",
+    },
+}
+
+
+def connect(path, configuration):
+    connection = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(connection, configuration["pragmas"])
+    return connection
+
+
+def setup(path, configuration):
+    connection = connect(path, configuration)
+    connection.execute(
+        "CREATE TABLE item (id INTEGER PRIMARY KEY, title TEXT, qty INTEGER)"
+    )
+    connection.executemany(
+        "INSERT INTO item (id, title, qty) VALUES (?, ?, 0)",
+        [(i, "item %s" % i) for i in range(ROWS)],
+    )
+    connection.close()
+
+
+def work(args):
+    """
+    Run reads and writes against the database until the deadline, the way
+    one web worker would, and return its latencies and lock errors.
+    """
+    path, name, duration, write_ratio, seed = args
+    configuration = CONFIGURATIONS[name]
+    rng = random.Random(seed)
+    connection = connect(path, configuration) if configuration["persistent"] else None
+    reads, writes, errors = [], [], 0
+
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        conn = connection or connect(path, configuration)
+        write = rng.random() < write_ratio
+        try:
+            if write:
+                conn.execute(configuration["begin"])
+                # Read then write in one transaction, like an add to basket
+                item = rng.randrange(ROWS)
+                conn.execute("SELECT qty FROM item WHERE id = ?", (item,)).fetchone()
+                conn.execute("UPDATE item SET qty = qty + 1 WHERE id = ?", (item,))
+                conn.execute("COMMIT")
+            else:
+                first = rng.randrange(ROWS - 20)
+                conn.execute(
+                    "SELECT id, title, qty FROM item WHERE id BETWEEN ? AND ?",
+                    (first, first + 20),
+                ).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        else:
+            (writes if write else reads).append(time.perf_counter() - start)
+        finally:
+            if connection is None:
+                conn.close()
+    if connection is not None:
+        connection.close()
+    return reads, writes, errors
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite read/write concurrency with the stock settings and "
+        "with the tuned backend, on a scratch database file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds.")
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            "%-7s %10s %10s %8s %11s %11s"
+            % ("config", "reads/s", "writes/s", "errors", "read p95", "write p95")
+        )
+        for name, configuration in CONFIGURATIONS.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "benchmark.sqlite3")
+                setup(path, configuration)
+                jobs = [
+                    (path, name, options["duration"], options["write_ratio"], seed)
+                    for seed in range(options["workers"])
+                ]
+                reads, writes, errors = [], [], 0
+                with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+                    for worker_reads, worker_writes, worker_errors in executor.map(
+                        work, jobs
+                    ):
+                        reads += worker_reads
+                        writes += worker_writes
+                        errors += worker_errors
+
+            self.stdout.write(
+                "%-7s %10.0f %10.0f %8s %9.2fms %9.2fms"
+                % (
+                    name,
+                    len(reads) / options["duration"],
+                    len(writes) / options["duration"],
+                    errors,
+                    percentile(reads, 0.95) * 1000,
+                    percentile(writes, 0.95) * 1000,
+                )
+            )
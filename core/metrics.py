@@ -0,0 +1,230 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Recent samples kept per view for the quantiles
+RESERVOIR_SIZE = 1024
+
+PHASES = ("db", "template", "cache", "view")
+
+CACHE_METHODS = (
+    "get",
+    "set",
+    "add",
+    "delete",
+    "touch",
+    "incr",
+    "decr",
+    "get_many",
+    "set_many",
+    "delete_many",
+    "has_key",
+)
+
+_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Seconds spent in each phase of the current request.
+    """
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self._depth = 0
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def activate(self):
+        return _timings.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _timings.reset(token)
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Connection execute wrapper adding statement time to the db phase.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.phases["db"] += time.perf_counter() - start
+
+
+def _timed_cache_method(method):
+    def timed(*args, **kwargs):
+        timings = _timings.get()
+        # Base implementations call each other (get_many -> get); only the
+        # outermost call is timed.
+        if timings is None or timings._depth:
+            return method(*args, **kwargs)
+        timings._depth += 1
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings._depth -= 1
+            timings.add("cache", time.perf_counter() - start)
+
+    return timed
+
+
+def instrument_cache(backend):
+    """
+    Time a cache backend's operations into the active request's timings.
+    Cache backends are per thread, so each one is wrapped once.
+    """
+    if getattr(backend, "_timed", False):
+        return
+    for name in CACHE_METHODS:
+        setattr(backend, name, _timed_cache_method(getattr(backend, name)))
+    backend._timed = True
+
+
+class Histogram:
+    """
+    Cumulative latency buckets plus a window of recent samples for
+    quantiles.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    def observe(self, seconds, phases):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+        for phase, value in phases.items():
+            self.phases[phase] += value
+
+    def quantile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Registry:
+    """
+    In-process latency histograms keyed by view name. Each worker process
+    keeps and reports its own numbers.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view_name, seconds, phases):
+        with self._lock:
+            histogram = self.histograms.get(view_name)
+            if histogram is None:
+                histogram = self.histograms[view_name] = Histogram()
+            histogram.observe(seconds, phases)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def render(self):
+        """
+        Return every histogram in the Prometheus text exposition format.
+        """
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            lines = [
+                "# HELP view_duration_seconds Request latency per view.",
+                "# TYPE view_duration_seconds histogram",
+            ]
+            for view, histogram in histograms:
+                cumulative = 0
+                bounds = LATENCY_BUCKETS + ("+Inf",)
+                for bound, count in zip(bounds, histogram.buckets):
+                    cumulative += count
+                    lines.append(
+                        'view_duration_seconds_bucket{view="%s",le="%s"} %s'
+                        % (view, bound, cumulative)
+                    )
+                lines.append(
+                    'view_duration_seconds_sum{view="%s"} %.6f'
+                    % (view, histogram.sum)
+                )
+                lines.append(
+                    'view_duration_seconds_count{view="%s"} %s'
+                    % (view, histogram.count)
+                )
+
+            lines += [
+                "# HELP view_latency_seconds Latency quantiles over recent requests.",
+                "# TYPE view_latency_seconds summary",
+            ]
+            for view, histogram in histograms:
+                for q in QUANTILES:
+                    lines.append(
+                        'view_latency_seconds{view="%s",quantile="%s"} %.6f'
+                        % (view, q, histogram.quantile(q))
+                    )
+
+            lines += [
+                "# HELP view_phase_seconds_total Time spent per request phase.",
+                "# TYPE view_phase_seconds_total counter",
+            ]
+            for view, histogram in histograms:
+                for phase in PHASES:
+                    lines.append(
+                        'view_phase_seconds_total{view="%s",phase="%s"} %.6f'
+                        % (view, phase, histogram.phases[phase])
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def client_address(request):
+    """
+    Return the address of the client, looking through X-Forwarded-For when
+    the request comes from one of TRUSTED_PROXIES. Those proxies must set
+    or append to the header, or clients could forge it.
+    """
+    address = request.META.get("REMOTE_ADDR")
+    trusted = getattr(settings, "TRUSTED_PROXIES", ())
+    if address not in trusted:
+        return address
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    # Proxies append, so walk back from the nearest hop
+    for hop in reversed(hops):
+        address = hop
+        if hop not in trusted:
+            break
+    return address
+
+
+def shows_internals(request):
+    """
+    Return whether a request may see /metrics, timings and query stats:
+    with DEBUG on, from METRICS_ALLOWED_IPS, or for staff.
+    """
+    if settings.DEBUG:
+        return True
+    if client_address(request) in getattr(settings, "METRICS_ALLOWED_IPS", ()):
+        return True
+    user = getattr(request, "user", None)
+    return user is not None and user.is_staff
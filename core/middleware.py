@@ -0,0 +1,249 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, router
+from django.http import HttpResponse
+
+from .metrics import RequestTimings, instrument_cache, registry, shows_internals
+from .routers import (
+    PrimaryReplicaRouter,
+    has_written,
+    pin_to_primary,
+    replicas_read,
+    reset_pinning,
+    restore_pinning,
+)
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def statement_shape(sql):
+    """
+    Reduce a statement to its shape, so the same query run for different
+    rows (the signature of an N+1) groups together.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """
+    A connection execute wrapper counting and timing every statement.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[statement_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        """
+        Return the (shape, count) pairs run at least threshold times.
+        """
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the SQL run by each request and hold views to a query budget.
+
+    QUERY_BUDGETS maps view names ("store:store_home") to the most queries
+    the view may run. With QUERY_BUDGET_MODE "log" overruns and repeated
+    statement shapes are logged; with "raise" an overrun raises
+    QueryBudgetExceeded, which the test client re-raises in the test.
+    Responses carry X-Query-Count, X-Query-Time (ms) and X-Query-Repeated
+    (number of statement shapes flagged as N+1) only for the requests
+    shows_internals() allows.
+    """
+
+    def __init__(self, get_response):
+        if getattr(settings, "QUERY_BUDGET_MODE", "off") == "off":
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            response = self.get_response(request)
+
+        repeated = stats.repeated(getattr(settings, "QUERY_REPEAT_THRESHOLD", 5))
+        if shows_internals(request):
+            response["X-Query-Count"] = str(stats.count)
+            response["X-Query-Time"] = "%.2f" % (stats.duration * 1000)
+            response["X-Query-Repeated"] = str(len(repeated))
+
+        for shape, count in repeated:
+            logger.warning(
+                "possible N+1 in %s: %s x %s", request.path, count, shape
+            )
+        self.check_budget(request, stats)
+        return response
+
+    def check_budget(self, request, stats):
+        match = request.resolver_match
+        if match is None:
+            return
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(match.view_name)
+        if budget is None or stats.count <= budget:
+            return
+
+        message = "%s ran %s queries, budget is %s" % (
+            match.view_name,
+            stats.count,
+            budget,
+        )
+        if getattr(settings, "QUERY_BUDGET_MODE", "off") == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ServerTimingMiddleware:
+    """
+    Time each request's db, template, cache and view phases.
+
+    The phases are sent in a Server-Timing header (when SERVER_TIMING is
+    on, to the requests allowed to see the query stats) and recorded in the
+    in-process latency histograms for views in the METRICS_NAMESPACES URL
+    namespaces. "view" is everything outside template rendering, so it
+    includes the view's own queries and cache calls.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request._timings = RequestTimings()
+        token = timings.activate()
+        for alias in settings.CACHES:
+            instrument_cache(caches[alias])
+
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            timings.deactivate(token)
+        total = time.perf_counter() - start
+        timings.phases["view"] = max(total - timings.phases["template"], 0.0)
+
+        if getattr(settings, "SERVER_TIMING", True) and shows_internals(request):
+            response["Server-Timing"] = ", ".join(
+                [
+                    "%s;dur=%.2f" % (phase, value * 1000)
+                    for phase, value in timings.phases.items()
+                ]
+                + ["total;dur=%.2f" % (total * 1000)]
+            )
+
+        match = request.resolver_match
+        if match is not None and match.namespace in getattr(
+            settings, "METRICS_NAMESPACES", ()
+        ):
+            registry.observe(match.view_name, total, timings.phases)
+        return response
+
+    def process_template_response(self, request, response):
+        timings = request._timings
+        start = time.perf_counter()
+        response.add_post_render_callback(
+            lambda response: timings.add("template", time.perf_counter() - start)
+        )
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Give each request a fresh read-your-writes state for the database
+    router.
+
+    A request that writes sets a short lived cookie, so the requests that
+    follow it (the redirect after a POST) also read from the primary until
+    the replicas have caught up. Requests pinned only by the cookie do not
+    renew it.
+
+    A GET or HEAD whose view fails with a database error after reading from
+    a replica is dispatched again on the primary, and the replicas it used
+    are skipped for a while.
+    """
+
+    cookie_name = "db_pinned"
+
+    def __init__(self, get_response):
+        if not getattr(settings, "DATABASE_REPLICAS", ()):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = reset_pinning(self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if getattr(response, "retry_on_primary", False):
+                # Dispatch again through the rest of the middleware, so CSRF
+                # checks and the other process_view hooks run as before
+                pin_to_primary()
+                response = self.get_response(request)
+            wrote = has_written()
+        finally:
+            restore_pinning(token)
+        if wrote:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=getattr(settings, "DATABASE_PIN_SECONDS", 5),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_exception(self, request, exception):
+        replicas = replicas_read()
+        if (
+            not isinstance(exception, DatabaseError)
+            or request.method not in ("GET", "HEAD")
+            or not replicas
+            or getattr(request, "_replica_retried", False)
+        ):
+            return None
+        for database_router in router.routers:
+            if isinstance(database_router, PrimaryReplicaRouter):
+                for alias in replicas:
+                    database_router.mark_down(alias, exception)
+        request._replica_retried = True
+        # Stands in for the failed view until __call__ dispatches it again
+        response = HttpResponse(status=503)
+        response.retry_on_primary = True
+        return response
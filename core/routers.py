@@ -0,0 +1,147 @@
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_pinned = ContextVar("db_pinned", default=False)
+_wrote = ContextVar("db_wrote", default=False)
+_replicas_read = ContextVar("db_replicas_read", default=None)
+
+# Cheap, but fails on a replica that is reachable yet has no schema, such
+# as an empty SQLite file created by connecting to a missing path
+PROBE_SQL = "SELECT 1 FROM django_migrations LIMIT 1"
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def has_written():
+    """
+    Return whether the current unit of work wrote, as opposed to being
+    pinned by reset_pinning().
+    """
+    return _wrote.get()
+
+
+def replicas_read():
+    """
+    Return the replica aliases reads were sent to in the current unit of
+    work.
+    """
+    return set(_replicas_read.get() or ())
+
+
+def reset_pinning(pinned=False):
+    """
+    Start a new unit of work, such as a request, and return a token for
+    restore_pinning().
+    """
+    return (_pinned.set(pinned), _wrote.set(False), _replicas_read.set(set()))
+
+
+def restore_pinning(token):
+    pinned, wrote, replicas = token
+    _pinned.reset(pinned)
+    _wrote.reset(wrote)
+    _replicas_read.reset(replicas)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads of DATABASE_REPLICA_APPS models to the DATABASE_REPLICAS
+    aliases, round-robin, and everything else to the primary.
+
+    A write pins the current request to the primary so it reads its own
+    writes, and reads inside a transaction stay on the primary too. A
+    replica that cannot be reached, or has no schema, is skipped for
+    DATABASE_REPLICA_RETRY_SECONDS; with none available reads fall back to
+    the primary. ReplicaPinningMiddleware retries a read only request on the
+    primary when a query on a replica fails.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def reset_health(self):
+        with self._lock:
+            self._down_until.clear()
+
+    def replicas(self):
+        return getattr(settings, "DATABASE_REPLICAS", ())
+
+    def mark_down(self, alias, error):
+        retry = getattr(settings, "DATABASE_REPLICA_RETRY_SECONDS", 30)
+        logger.warning("replica %s is unavailable for %ss: %s", alias, retry, error)
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + retry
+
+    def is_healthy(self, alias):
+        if self._down_until.get(alias, 0) > time.monotonic():
+            return False
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            # Probe each new connection once with a real query
+            if getattr(connection, "probed", None) is not connection.connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(PROBE_SQL)
+                connection.probed = connection.connection
+        except DatabaseError as e:
+            connection.close()
+            self.mark_down(alias, e)
+            return False
+        return True
+
+    def choose_replica(self):
+        replicas = self.replicas()
+        if not replicas:
+            return None
+        start = next(self._counter)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if self.is_healthy(alias):
+                return alias
+        return None
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in getattr(settings, "DATABASE_REPLICA_APPS", ()):
+            return None
+        if is_pinned() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        alias = self.choose_replica()
+        if alias is None:
+            return DEFAULT_DB_ALIAS
+        replicas = _replicas_read.get()
+        if replicas is not None:
+            replicas.add(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *self.replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema and rows from the primary
+        if db in self.replicas():
+            return False
+        return None
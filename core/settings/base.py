@@ -3,7 +3,7 @@ from pathlib import Path
 from typing import cast
 import sys
 
-from decouple import config
+from decouple import Csv, config
 from django.urls import reverse
 from os.path import dirname, join, normpath, abspath, basename
 
@@ -39,11 +39,13 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     
     # local apps
+    "core",
     "store",
     "basket",
     "account",
     "checkout",
     'orders',
+    "jobs",
 
     # 3rd party apps
     "mptt",
@@ -51,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ServerTimingMiddleware",
+    "core.middleware.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,6 +62,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -84,13 +89,90 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 
 # Database
+# core.db.backends.sqlite3 applies the WAL/busy_timeout pragmas on connect,
+# see DEFAULT_PRAGMAS there. Connections are kept for CONN_MAX_AGE seconds
+# and checked with SELECT 1 after an error.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "core.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=600, cast=int),
+        "OPTIONS": {
+            "transaction_mode": config("DB_TRANSACTION_MODE", default="IMMEDIATE"),
+            "pragmas": {
+                "synchronous": config("DB_SYNCHRONOUS", default="normal"),
+                "busy_timeout": config("DB_BUSY_TIMEOUT", default=5000, cast=int),
+                "cache_size": config("DB_CACHE_SIZE", default=-64000, cast=int),
+                "mmap_size": config("DB_MMAP_SIZE", default=268435456, cast=int),
+            },
+        },
     }
 }
 
+# Read replicas, given as a comma separated list of SQLite files kept in sync
+# with the primary. Reads of DATABASE_REPLICA_APPS models go to them (see
+# core.routers); a request that writes, and requests within
+# DATABASE_PIN_SECONDS after it, read from the primary.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    config("DATABASE_REPLICA_NAMES", default="", cast=Csv()), start=1
+):
+    alias = "replica%s" % number
+    DATABASES[alias] = dict(DATABASES["default"], NAME=name, TEST={"MIRROR": "default"})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+# Orders and checkout rows are read back right after they are written, so
+# they always stay on the primary
+DATABASE_REPLICA_APPS = ("store", "account")
+DATABASE_REPLICA_RETRY_SECONDS = 30
+DATABASE_PIN_SECONDS = config("DATABASE_PIN_SECONDS", default=5, cast=int)
+
+# Cache
+# Point CACHE_BACKEND at a shared cache (memcached, redis, ...) in production
+# so every worker sees the same category/version keys.
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="ecommerce"),
+    }
+}
+
+# Seconds anonymous catalog pages stay in the full-page cache; 0 disables it
+STORE_PAGE_CACHE_SECONDS = config("STORE_PAGE_CACHE_SECONDS", default=600, cast=int)
+# Seconds browsers and shared caches may reuse those pages before they
+# revalidate them with If-None-Match / If-Modified-Since
+STORE_PAGE_MAX_AGE = config("STORE_PAGE_MAX_AGE", default=60, cast=int)
+
+# SQL query budgets per view name. QUERY_BUDGET_MODE is "off", "log" or
+# "raise"; statements repeated QUERY_REPEAT_THRESHOLD times in one request
+# are reported as a likely N+1.
+QUERY_BUDGET_MODE = config("QUERY_BUDGET_MODE", default="log")
+QUERY_REPEAT_THRESHOLD = 5
+# Signed in requests also load the session, the user and the saved basket.
+# Budgets assume warm caches: the first request after an invalidation also
+# rebuilds the category index or the checkout reference data.
+QUERY_BUDGETS = {
+    "store:store_home": 4,
+    "store:category_list": 5,
+    "store:product_detail": 6,
+    "store:search": 5,
+    "basket:basket_summary": 4,
+    "basket:basket_state": 3,
+}
+
+# Send phase timings in a Server-Timing header, and collect per-view latency
+# histograms for these URL namespaces at /metrics
+SERVER_TIMING = config("SERVER_TIMING", default=True, cast=bool)
+METRICS_NAMESPACES = ("store", "basket", "checkout", "account")
+# Clients allowed /metrics, Server-Timing and the X-Query-* headers. Behind a
+# reverse proxy every request comes from the proxy's address, so list the
+# proxy in TRUSTED_PROXIES to use the X-Forwarded-For address it sets instead
+METRICS_ALLOWED_IPS = config("METRICS_ALLOWED_IPS", default="127.0.0.1", cast=Csv())
+TRUSTED_PROXIES = config("TRUSTED_PROXIES", default="", cast=Csv())
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -130,6 +212,25 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Basket session ID
 BASKET_SESSION_ID = "basket"
 
+# Pack the basket and checkout session keys into binary records
+SESSION_SERIALIZER = "basket.serializers.PackedSessionSerializer"
+
+# Keep signed in customers' baskets in the database instead of the session
+BASKET_PERSISTENT = config("BASKET_PERSISTENT", default=True, cast=bool)
+
+# Background jobs, run by the run_jobs command. Eager mode runs each job
+# in process as soon as it is queued.
+JOBS_ALWAYS_EAGER = config("JOBS_ALWAYS_EAGER", default=False, cast=bool)
+# Delay before the first retry, doubled for each later attempt
+JOBS_BACKOFF_SECONDS = 10
+# A running job whose worker has been silent this long is claimed again.
+# A job that is merely slow then runs twice, so jobs must be idempotent and
+# this must stay well above the longest job.
+JOBS_LOCK_TIMEOUT = config("JOBS_LOCK_TIMEOUT", default=300, cast=int)
+
+# How long a customer's wishlist ids stay cached; changes invalidate it
+WISHLIST_CACHE_SECONDS = 24 * 60 * 60
+
 # MEDIA
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.db.backends.sqlite3.base import DatabaseWrapper
+
+
+class TestSQLiteBackend(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = dict(connection.settings_dict)
+        settings_dict["NAME"] = os.path.join(directory.name, "db.sqlite3")
+        settings_dict["OPTIONS"] = {
+            "transaction_mode": "IMMEDIATE",
+            "pragmas": {"busy_timeout": 1234, "mmap_size": None},
+        }
+        self.database = DatabaseWrapper(settings_dict, alias="scratch")
+        self.addCleanup(self.database.close)
+
+    def pragma(self, name):
+        with self.database.cursor() as cursor:
+            cursor.execute("PRAGMA %s" % name)
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """
+        Test new connections get WAL and the configured pragmas
+        """
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 1234)
+        self.assertEqual(self.pragma("mmap_size"), 0)
+        self.assertTrue(self.database.is_usable())
+
+    def test_immediate_transactions(self):
+        """
+        Test atomic blocks take the write lock when they begin
+        """
+        self.database.ensure_connection()
+        self.database._start_transaction_under_autocommit()
+        options = {"transaction_mode": "IMMEDIATE", "pragmas": {"busy_timeout": 0}}
+        other = DatabaseWrapper(
+            dict(self.database.settings_dict, OPTIONS=options), alias="other"
+        )
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(Exception, "database is locked"):
+            other.ensure_connection()
+            other._start_transaction_under_autocommit()
+        self.database.connection.execute("ROLLBACK")
+
+
+class TestHealth(TestCase):
+    def test_health(self):
+        """
+        Test the health check reports the database as available
+        """
+        response = self.client.get(reverse("health"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), {"status": "ok", "databases": {"default": "ok"}}
+        )
@@ -0,0 +1,87 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+from store.models import Category, Product, ProductType
+
+
+@override_settings(STORE_PAGE_CACHE_SECONDS=0)
+class TestServerTiming(TestCase):
+    def setUp(self):
+        registry.reset()
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        Product.objects.create(
+            product_type=product_type,
+            category=category,
+            title="django beginners",
+            slug="django-beginners",
+            regular_price="20.00",
+            discount_price="15.00",
+        )
+
+    def test_server_timing_header(self):
+        """
+        Test responses report every phase in the Server-Timing header
+        """
+        response = self.client.get(reverse("store:store_home"))
+        phases = dict(
+            item.split(";dur=") for item in response["Server-Timing"].split(", ")
+        )
+        self.assertEqual(set(phases), {"db", "template", "cache", "view", "total"})
+        self.assertGreater(float(phases["db"]), 0)
+        self.assertGreater(float(phases["template"]), 0)
+
+    def test_metrics_endpoint(self):
+        """
+        Test view latencies are exported in the Prometheus text format
+        """
+        for _ in range(3):
+            self.client.get(reverse("store:store_home"))
+        self.client.get(reverse("basket:basket_summary"))
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        for line in [
+            'view_duration_seconds_count{view="store:store_home"} 3',
+            'view_duration_seconds_bucket{view="store:store_home",le="+Inf"} 3',
+            'view_latency_seconds{view="store:store_home",quantile="0.99"}',
+            'view_duration_seconds_count{view="basket:basket_summary"} 1',
+        ]:
+            self.assertIn(line, body)
+        self.assertNotIn('view="metrics"', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_metrics_restricted(self):
+        """
+        Test the metrics endpoint is hidden from other addresses
+        """
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_server_timing_restricted(self):
+        """
+        Test timings are only sent to the clients allowed the metrics
+        """
+        response = self.client.get(reverse("store:store_home"))
+        self.assertFalse(response.has_header("Server-Timing"))
+        response = self.client.get(reverse("store:store_home"), REMOTE_ADDR="10.0.0.1")
+        self.assertTrue(response.has_header("Server-Timing"))
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"], TRUSTED_PROXIES=["127.0.0.1"])
+    def test_forwarded_address_behind_proxy(self):
+        """
+        Test requests through a trusted proxy are judged by the forwarded
+        address, ignoring hops the client made up
+        """
+        response = self.client.get(
+            reverse("metrics"), HTTP_X_FORWARDED_FOR="127.0.0.1, 203.0.113.5"
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse("store:store_home"), HTTP_X_FORWARDED_FOR="203.0.113.5"
+        )
+        self.assertFalse(response.has_header("Server-Timing"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import QueryBudgetExceeded, QueryStats, statement_shape
+from store.models import Category, Product, ProductType
+
+
+@override_settings(QUERY_BUDGET_MODE="raise", STORE_PAGE_CACHE_SECONDS=0)
+class TestQueryBudget(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.products = [
+            Product.objects.create(
+                product_type=product_type,
+                category=category,
+                title="book %s" % i,
+                slug="book-%s" % i,
+                regular_price="20.00",
+                discount_price="15.00",
+            )
+            for i in range(25)
+        ]
+
+    def test_statement_shape(self):
+        """
+        Test statements differing only in values share a shape
+        """
+        self.assertEqual(
+            statement_shape('SELECT "a" FROM "t" WHERE "id" IN (%s, %s) LIMIT 21'),
+            statement_shape("SELECT \"a\"  FROM \"t\"\nWHERE \"id\" IN (%s) LIMIT 1"),
+        )
+        self.assertNotEqual(
+            statement_shape('SELECT "a" FROM "t"'),
+            statement_shape('SELECT "b" FROM "t"'),
+        )
+
+    def test_repeated_statements_flagged(self):
+        """
+        Test a query run once per row is reported as repeated
+        """
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            Product.objects.count()
+            for product in self.products[:5]:
+                Product.objects.get(id=product.id)
+        self.assertEqual(stats.count, 6)
+        self.assertEqual([count for shape, count in stats.repeated(5)], [5])
+
+    def test_store_home_within_budget(self):
+        """
+        Test the home page runs at most 3 queries for visitors and stays in
+        budget for signed in customers
+        """
+        response = self.client.get(reverse("store:store_home"))
+        self.assertLessEqual(int(response["X-Query-Count"]), 3)
+        self.assertEqual(response["X-Query-Repeated"], "0")
+
+        user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        self.client.force_login(user)
+        self.client.get(reverse("store:store_home"))
+
+    @override_settings(DEBUG=False, METRICS_ALLOWED_IPS=())
+    def test_stats_headers_only_for_staff(self):
+        """
+        Test query stats are not disclosed to the public
+        """
+        url = reverse("store:store_home")
+        self.assertFalse(self.client.get(url).has_header("X-Query-Count"))
+
+        user = get_user_model().objects.create_user(
+            "a@a.com", "a", "password", is_active=True
+        )
+        user.is_staff = True
+        user.save()
+        self.client.force_login(user)
+        self.assertTrue(self.client.get(url).has_header("X-Query-Count"))
+
+    def test_budget_overrun_raises(self):
+        """
+        Test a view over its budget raises in raise mode
+        """
+        with override_settings(QUERY_BUDGETS={"store:store_home": 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("store:store_home"))
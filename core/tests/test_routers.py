@@ -0,0 +1,210 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.db import connections, router
+from django.http import HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import ReplicaPinningMiddleware
+from core.routers import (
+    PrimaryReplicaRouter,
+    is_pinned,
+    reset_pinning,
+    restore_pinning,
+)
+from store.models import Category, Product, ProductType
+
+
+class ReplicaTestCase(TransactionTestCase):
+    """
+    Add SQLite file replicas next to the test database. sync_replicas()
+    copies the primary into them, standing in for replication.
+    """
+
+    replicas = ("replica1", "replica2")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for alias in self.replicas:
+            connections.settings[alias] = dict(
+                connections["default"].settings_dict,
+                NAME=os.path.join(directory.name, "%s.sqlite3" % alias),
+            )
+            self.addCleanup(self.remove_replica, alias)
+
+        for database_router in router.routers:
+            if isinstance(database_router, PrimaryReplicaRouter):
+                self.addCleanup(database_router.reset_health)
+
+        token = reset_pinning()
+        self.addCleanup(restore_pinning, token)
+        settings = override_settings(DATABASE_REPLICAS=list(self.replicas))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def remove_replica(self, alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    def sync_replicas(self):
+        source = connections["default"]
+        source.ensure_connection()
+        for alias in self.replicas:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+            source.connection.backup(target)
+            target.close()
+
+
+class TestPrimaryReplicaRouter(ReplicaTestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(name="django", slug="django")
+        product_type = ProductType.objects.create(name="book")
+        self.product = Product.objects.create(
+            product_type=product_type,
+            category=category,
+            title="django beginners",
+            slug="django-beginners",
+            regular_price="20.00",
+            discount_price="15.00",
+        )
+        self.sync_replicas()
+        reset_pinning()
+
+    def test_reads_go_to_replicas_round_robin(self):
+        """
+        Test catalog reads alternate between the replicas
+        """
+        used = {router.db_for_read(Product) for _ in range(4)}
+        self.assertEqual(used, set(self.replicas))
+        self.assertEqual(
+            Product.objects.get(id=self.product.id)._state.db[:7], "replica"
+        )
+
+    def test_write_pins_to_primary(self):
+        """
+        Test a request reads its own writes after writing
+        """
+        Product.objects.filter(id=self.product.id).update(title="changed")
+        self.assertEqual(Product.objects.get(id=self.product.id).title, "changed")
+
+        reset_pinning()
+        self.assertEqual(
+            Product.objects.get(id=self.product.id).title, "django beginners"
+        )
+
+    def test_unavailable_replica_skipped(self):
+        """
+        Test reads fall back when replicas cannot be reached
+        """
+        connections["replica1"].settings_dict["NAME"] = "/missing/replica.sqlite3"
+        with self.assertLogs("core.routers", "WARNING"):
+            self.assertEqual(
+                {router.db_for_read(Product) for _ in range(4)}, {"replica2"}
+            )
+        connections["replica2"].close()
+        connections["replica2"].settings_dict["NAME"] = "/missing/replica.sqlite3"
+        with self.assertLogs("core.routers", "WARNING"):
+            self.assertEqual(router.db_for_read(Product), "default")
+
+    def test_replica_without_schema_skipped(self):
+        """
+        Test a replica that connects but has no tables, such as an empty
+        SQLite file, is not used
+        """
+        connections["replica1"].close()
+        os.remove(connections["replica1"].settings_dict["NAME"])
+        with self.assertLogs("core.routers", "WARNING"):
+            self.assertEqual(
+                {router.db_for_read(Product) for _ in range(4)}, {"replica2"}
+            )
+
+    def test_other_apps_use_primary(self):
+        """
+        Test models outside the replica apps are left on the primary
+        """
+        from basket.models import BasketLine
+
+        self.assertEqual(router.db_for_read(BasketLine), "default")
+
+
+class TestReplicaPinningMiddleware(ReplicaTestCase):
+    def test_pinning_reset_per_request(self):
+        """
+        Test each request starts unpinned and a write pins the next ones
+        """
+        pinned = []
+
+        def view(request):
+            pinned.append(is_pinned())
+            if request.method == "POST":
+                ProductType.objects.create(name="book")
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        self.assertNotIn("db_pinned", middleware(factory.get("/")).cookies)
+        response = middleware(factory.post("/"))
+        self.assertIn("db_pinned", response.cookies)
+
+        middleware(factory.get("/"))
+        request = factory.get("/")
+        request.COOKIES["db_pinned"] = "1"
+        response = middleware(request)
+        self.assertEqual(pinned, [False, False, False, True])
+        self.assertFalse(is_pinned())
+        # Only a write renews the cookie
+        self.assertNotIn("db_pinned", response.cookies)
+
+    @override_settings(STORE_PAGE_CACHE_SECONDS=0)
+    def test_failed_replica_read_retried_on_primary(self):
+        """
+        Test a GET whose replica query fails is answered from the primary
+        """
+        category = Category.objects.create(name="django", slug="django")
+        Product.objects.create(
+            product_type=ProductType.objects.create(name="book"),
+            category=category,
+            title="django beginners",
+            slug="django-beginners",
+            regular_price="20.00",
+            discount_price="15.00",
+        )
+        self.sync_replicas()
+        # The replicas are reachable but lag behind the primary's schema
+        for alias in self.replicas:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+            target.execute('DROP TABLE "store_product"')
+            target.close()
+
+        with mock.patch.object(
+            CsrfViewMiddleware, "process_view", autospec=True, return_value=None
+        ) as process_view, self.assertLogs("core.routers", "WARNING"):
+            response = self.client.get(reverse("store:store_home"))
+        self.assertContains(response, "django beginners")
+        # The retry went through the middleware again
+        self.assertEqual(process_view.call_count, 2)
+
+
+class TestHealth(ReplicaTestCase):
+    def test_replica_without_schema_down(self):
+        """
+        Test the health check reports an empty replica as unavailable
+        """
+        response = self.client.get(reverse("health"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            response.json()["databases"],
+            {"default": "ok", "replica1": "unavailable", "replica2": "unavailable"},
+        )
+
+        self.sync_replicas()
+        self.assertEqual(self.client.get(reverse("health")).status_code, 200)
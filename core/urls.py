@@ -3,12 +3,17 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from . import views
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", views.metrics, name="metrics"),
+    path("health", views.health, name="health"),
     path("", include("store.urls", namespace="store")),
     path("basket/", include("basket.urls", namespace="basket")),
     path("account/", include("account.urls", namespace="account")),
     path("checkout/", include("checkout.urls", namespace="checkout")),
+    path("orders/", include("orders.urls", namespace="orders")),
 ]
 
 if settings.DEBUG:
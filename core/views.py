@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+
+from .metrics import client_address, registry
+from .routers import PROBE_SQL
+
+
+def metrics(request):
+    """
+    Expose this process's view latency histograms to Prometheus.
+    """
+    if client_address(request) not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@never_cache
+def health(request):
+    """
+    Report whether every configured database answers, for load balancers.
+    A replica missing its schema, such as an empty SQLite file, is down.
+    """
+    databases = {}
+    for alias in connections:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(PROBE_SQL)
+            databases[alias] = "ok"
+        except DatabaseError:
+            databases[alias] = "unavailable"
+
+    healthy = all(state == "ok" for state in databases.values())
+    return JsonResponse(
+        {"status": "ok" if healthy else "unavailable", "databases": databases},
+        status=200 if healthy else 503,
+    )